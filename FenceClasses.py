@@ -1,6 +1,7 @@
 import bpy
-from bpy_extras.io_utils import ExportHelper, ImportHelper
-from .utils_bpy import reminder
+from bpy_extras.io_utils import ImportHelper
+from .utils_bpy import reminder, P3DExportHelper
+from .utils_profile import profiled
 from .FenceManager import *
 
 
@@ -9,11 +10,12 @@ class FileImportFences(bpy.types.Operator, ImportHelper):
     bl_label = 'Import Fences...'
     filename_ext = '.p3dxml'
     filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
+        default='*.p3dxml;*.p3d',
         options={'HIDDEN'},
         maxlen=255,
         )
 
+    @profiled
     def execute(self, context):
         fence_objs = import_fences(self.filepath)
         for obj in fence_objs:
@@ -21,21 +23,16 @@ class FileImportFences(bpy.types.Operator, ImportHelper):
         return {'FINISHED'}
 
 
-class FileExportFences(bpy.types.Operator, ExportHelper):
+class FileExportFences(bpy.types.Operator, P3DExportHelper):
     bl_idname = 'export_scene.fences_p3dxml'
     bl_label = 'Export Fences...'
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
-        options={'HIDDEN'},
-        maxlen=255,
-        )
     selected_only: bpy.props.BoolProperty(
         name='Selected Only',
         description='Only export selected fences',
         default=False,
         )
 
+    @profiled
     def execute(self, context):
         if self.selected_only:
             objs = context.selected_objects
@@ -63,6 +60,7 @@ class FenceCreate(bpy.types.Operator):
     bl_label = 'Create Basic Fence'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         fence_obj = fence_create([context.scene.cursor.location, context.scene.cursor.location + Vector((10,30,0))], context)
         fence_obj.select_set(True)
@@ -79,6 +77,7 @@ class FenceCreateFromSelectedEdges(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'MESH'
 
+    @profiled
     def execute(self, context):        
         target_obj = context.object
         target_mesh = bpy.types.Mesh(target_obj.data)
@@ -105,6 +104,7 @@ class FenceFlip(bpy.types.Operator):
     def poll(cls, context):
         return fence_flippable(context.object)
 
+    @profiled
     def execute(self, context):
         for obj in context.selected_objects:
             if fence_flippable(obj):
@@ -31,7 +31,8 @@ def get_fence_collection(context):
 #     return fco
 
 def fence_create(points, context = bpy.context):
-    fc = bpy.data.curves.new('Fence', 'CURVE')
+    with phase('new'):
+        fc = bpy.data.curves.new('Fence', 'CURVE')
     fc.dimensions = '2D'
     fc.extrude = 50
     fcs = fc.splines.new('POLY')
@@ -40,9 +41,11 @@ def fence_create(points, context = bpy.context):
         fcs.points[i].co.xy = p.xy
     fcs.use_endpoint_u = True
     fcs.use_smooth = False
-    fco = bpy.data.objects.new('Fence', fc)
+    with phase('new'):
+        fco = bpy.data.objects.new('Fence', fc)
     fco.lock_rotation = [True,True,False]
-    get_fence_collection(context).objects.link(fco)
+    with phase('link'):
+        get_fence_collection(context).objects.link(fco)
     return fco
 
 
@@ -56,48 +59,55 @@ def fence_flip(obj):
             pts[-i-1].co = a
 
 
+@traced
+@phase('build')
 def import_fences(filepath):
     """Returns a list of fence objs"""
     fences = []
-    root = terra_read(filepath)
-    for fence in find_chunks(root, FEN):
-        fence_data = list(fence)[0]
-        fences.append(fence_create([find_xyz(fence_data, 'Start'), find_xyz(fence_data, 'End')]))
+    for fence in terra_iter(filepath, (FEN,)):
+        fences.append(fence_import(fence))
     return fences
 
+
+def fence_import(fence):
+    """creates fence object from Fence chunk"""
+    with phase('lookup'):
+        fence_data = list(fence)[0]
+        points = [find_xyz(fence_data, 'Start'), find_xyz(fence_data, 'End')]
+    return fence_create(points)
+
 def fence_flippable(obj : bpy.types.Object):
     return obj is not None and obj.type == 'CURVE' and obj.data.splines
 
+@traced
 def export_fences(filepath, objs):
     """If found 'faulty' fences were True"""
     no_faults = True
-    root = p3d_et()
-    for obj in objs:
-        obj = bpy.types.Object(obj)
-        if not obj.data.splines: 
-            continue
-        if obj.modifiers:
-            no_faults = False
-            print(f"{obj.name} has modifiers. Result may be unexpected")
-        MW = Matrix(obj.matrix_world)
-        if MW.to_euler().x != 0 or MW.to_euler().y != 0:
-            no_faults = False
-            print(f"{obj.name} has non-zero XY rotation! Result may be unexpected")
-        for spline in obj.data.splines:
-            spline = bpy.types.Spline(spline)
-            for i in range(1,len(spline.points)):
-                fen = write_chunk(root, FEN)
-                fen2 = write_chunk(fen, FEN2)
-                start = obj.matrix_world @ spline.points[i-1].co.to_3d()
-                end = obj.matrix_world @ spline.points[i].co.to_3d()
-                start.z = 0
-                end.z = 0
-                no = (end - start).cross(Vector((0, 0, 1))).normalized()
-                no.z = 0
-                no.negate()
-                write_xyz(fen2, 'Start', *start)
-                write_xyz(fen2, 'End', *end)
-                write_xyz(fen2, 'Normal', *no)
+    with p3d_writer(filepath) as w:
+        for obj in objs:
+            obj = bpy.types.Object(obj)
+            if not obj.data.splines: 
+                continue
+            if obj.modifiers:
+                no_faults = False
+                print(f"{obj.name} has modifiers. Result may be unexpected")
+            MW = Matrix(obj.matrix_world)
+            if MW.to_euler().x != 0 or MW.to_euler().y != 0:
+                no_faults = False
+                print(f"{obj.name} has non-zero XY rotation! Result may be unexpected")
+            for spline in obj.data.splines:
+                spline = bpy.types.Spline(spline)
+                for i in range(1,len(spline.points)):
+                    start = obj.matrix_world @ spline.points[i-1].co.to_3d()
+                    end = obj.matrix_world @ spline.points[i].co.to_3d()
+                    start.z = 0
+                    end.z = 0
+                    no = (end - start).cross(Vector((0, 0, 1))).normalized()
+                    no.z = 0
+                    no.negate()
+                    with w.chunk(FEN), w.chunk(FEN2):
+                        w.xyz('Start', *start)
+                        w.xyz('End', *end)
+                        w.xyz('Normal', *no)
 
-    write_ET(root, filepath)
     return no_faults
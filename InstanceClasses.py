@@ -1,17 +1,15 @@
 import bpy
 from bpy.props import *
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import ImportHelper
 from os import path
 from .utils_p3dxml import *
+from .InstanceManager import *
+from .utils_profile import profiled
+from .utils_bpy import P3DExportHelper
 
-class Export_instance_listOperator(bpy.types.Operator, ExportHelper):    
+class Export_instance_listOperator(bpy.types.Operator, P3DExportHelper):    
     bl_idname = "export_scene.list_instance"
     bl_label = "Export Instance List"
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
-        options={'HIDDEN'},
-        maxlen=255)
     selected_only: bpy.props.BoolProperty(
         name='Selected Only',
         description='Only export selected objects',
@@ -22,6 +20,7 @@ class Export_instance_listOperator(bpy.types.Operator, ExportHelper):
         default="untitled drawable",
         )
 
+    @profiled
     def execute(self, context):
         listname = os.path.splitext(os.path.basename(self.filepath))[0]
         OSD_name = self.OSD_name
@@ -29,31 +28,7 @@ class Export_instance_listOperator(bpy.types.Operator, ExportHelper):
             objs = list(context.selected_objects)
         else:
             objs = list(context.scene.collection.all_objects)
-        root = p3d_et()
-        InstanceList = write_chunk(root, "0x3000008")
-        write_val(InstanceList, "Name", listname)
-        write_val(InstanceList, "Data", "")
-        Scenegraph = write_chunk(InstanceList, "0x120100")
-        write_val(Scenegraph, "Name", listname)
-        write_val(Scenegraph, "Data", "AAAAAA==")
-        OSR = write_chunk(Scenegraph, "0x120101")
-        write_val(OSR, "Data", "")
-        OSB = write_chunk(OSR, "0x120102")
-        write_val(OSB, "Name", "root")
-        OST = write_chunk(OSB, "0x120103")
-        write_val(OST, "Name", listname)
-        write_mat_xyz(OST, "Transform", *(0,0,0))
-        for i,obj in enumerate(objs):
-            OSTi = write_chunk(OST, "0x120103")
-            write_val(OSTi, "Name", OSD_name+str(i+1))
-            write_locrot_to_mat(OSTi, obj, "Transform")
-            OSD = write_chunk(OSTi, "0x120107")
-            write_val(OSD, "Name", OSD_name)
-            write_val(OSD, "DrawableName", OSD_name)
-            write_val(OSD, "IsTranslucent", 0)
-            OSSO = write_chunk(OSD, "0x12010A")
-            write_val(OSSO, "SortOrder", 0.5)
-        write_ET(root, self.filepath)
+        export_instance_list(self.filepath, objs, listname, OSD_name)
         self.report({'INFO'}, f"Successfully exported {len(objs)} objects")
         return {'FINISHED'}
 
@@ -63,7 +38,7 @@ class Import_instance_listOperator(bpy.types.Operator, ImportHelper):
     bl_label = "Import Instance List"
     filename_ext = '.p3dxml'
     filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
+        default='*.p3dxml;*.p3d',
         options={'HIDDEN'},
         maxlen=255)
 
@@ -72,6 +47,7 @@ class Import_instance_listOperator(bpy.types.Operator, ImportHelper):
         default=False,
     )
 
+    @profiled
     def execute(self, context):
         if self.active_obj_as_model and not context.active_object:
             self.report(type={'ERROR'}, message="No Active Object Selected!")
@@ -85,30 +61,14 @@ class Import_instance_listOperator(bpy.types.Operator, ImportHelper):
         root = terra_read(self.filepath)
         if root.tag == 'Pure3DFile':
             root = root[0]
-        if root.attrib['Type'] == "0x3000008":
+        if root.attrib['Type'] == INL:
             IL = root
-        elif find_chunks(root, "0x3000008"):
-            IL = find_chunks(root, "0x3000008")[0]
+        elif find_chunks(root, INL):
+            IL = find_chunks(root, INL)[0]
         else:
             self.report(type={'WARNING'}, message="No Instance List Chunks Found!")
             return {'FINISHED'}
-        instance_name = find_val(IL, "Name")
-        Scenegraph = find_chunks(IL, "0x120100")[0]
-        OSR = find_chunks(Scenegraph, "0x120101")[0] # Old Scenegraph Root
-        OSB = find_chunks(OSR, "0x120102")[0] # Old Scenegraph Branch
-        Master_Transform = find_chunks(OSB, "0x120103")[0]
-        MT_locrot = (find_xyz_from_mat(Master_Transform,"Transform"),find_euler_from_mat(Master_Transform,"Transform"))
-        tree_coll = bpy.data.collections.new(instance_name+"_instances")
-        context.collection.children.link(tree_coll)
-        for leaf in find_chunks(Master_Transform, "0x120103"):
-            leaf_obj = bpy.data.objects.new(find_val(leaf,"Name"),instance_source)
-            if leaf_obj.data is None:
-                leaf_obj.empty_display_type = 'ARROWS'
-            leaf_obj.location = find_xyz_from_mat(leaf, "Transform")
-            leaf_obj.location += MT_locrot[0]
-            leaf_obj.rotation_euler = find_euler_from_mat(leaf, "Transform")
-            leaf_obj.rotation_euler.rotate(MT_locrot[1])
-            tree_coll.objects.link(leaf_obj)
+        import_instance_list(IL, context, instance_source)
         return {'FINISHED'}
 
 
@@ -0,0 +1,57 @@
+import bpy
+from .utils_p3dxml import *
+
+
+@traced
+@phase('build')
+def import_instance_list(IL, context, instance_source=None):
+    """creates objects (or empties if instance_source is None) from Instance List chunk, returns their collection"""
+    instance_name = find_val(IL, "Name")
+    Scenegraph = find_chunks(IL, "0x120100")[0]
+    OSR = find_chunks(Scenegraph, "0x120101")[0] # Old Scenegraph Root
+    OSB = find_chunks(OSR, "0x120102")[0] # Old Scenegraph Branch
+    Master_Transform = find_chunks(OSB, "0x120103")[0]
+    MT_locrot = (find_xyz_from_mat(Master_Transform,"Transform"),find_euler_from_mat(Master_Transform,"Transform"))
+    tree_coll = bpy.data.collections.new(instance_name+"_instances")
+    context.collection.children.link(tree_coll)
+    for leaf in find_chunks(Master_Transform, "0x120103"):
+        with phase('new'):
+            leaf_obj = bpy.data.objects.new(find_val(leaf,"Name"),instance_source)
+        if leaf_obj.data is None:
+            leaf_obj.empty_display_type = 'ARROWS'
+        leaf_obj.location = find_xyz_from_mat(leaf, "Transform")
+        leaf_obj.location += MT_locrot[0]
+        leaf_obj.rotation_euler = find_euler_from_mat(leaf, "Transform")
+        leaf_obj.rotation_euler.rotate(MT_locrot[1])
+        with phase('link'):
+            tree_coll.objects.link(leaf_obj)
+    return tree_coll
+
+
+@traced
+def export_instance_list(filepath, objs, listname, OSD_name):
+    root = p3d_et()
+    InstanceList = write_chunk(root, INL)
+    write_val(InstanceList, "Name", listname)
+    write_val(InstanceList, "Data", "")
+    Scenegraph = write_chunk(InstanceList, "0x120100")
+    write_val(Scenegraph, "Name", listname)
+    write_val(Scenegraph, "Data", "AAAAAA==")
+    OSR = write_chunk(Scenegraph, "0x120101")
+    write_val(OSR, "Data", "")
+    OSB = write_chunk(OSR, "0x120102")
+    write_val(OSB, "Name", "root")
+    OST = write_chunk(OSB, "0x120103")
+    write_val(OST, "Name", listname)
+    write_mat_xyz(OST, "Transform", *(0,0,0))
+    for i,obj in enumerate(objs):
+        OSTi = write_chunk(OST, "0x120103")
+        write_val(OSTi, "Name", OSD_name+str(i+1))
+        write_locrot_to_mat(OSTi, obj, "Transform")
+        OSD = write_chunk(OSTi, "0x120107")
+        write_val(OSD, "Name", OSD_name)
+        write_val(OSD, "DrawableName", OSD_name)
+        write_val(OSD, "IsTranslucent", 0)
+        OSSO = write_chunk(OSD, "0x12010A")
+        write_val(OSSO, "SortOrder", 0.5)
+    write_ET(root, filepath)
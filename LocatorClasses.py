@@ -1,7 +1,8 @@
 import bpy
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import ImportHelper
 from mathutils import Vector
-from .utils_bpy import reminder
+from .utils_bpy import reminder, P3DExportHelper
+from .utils_profile import profiled
 from . import LocatorManager as LM
 from os import path
 from math import radians
@@ -230,6 +231,7 @@ class MDE_OP_Flip_Volume_Shape(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'EMPTY' and context.object.parent and context.object.parent.locator_prop and context.object.parent.locator_prop.is_locator
 
+    @profiled
     def execute(self, context):
         if context.object.empty_display_type == 'SPHERE':
             context.object.empty_display_type = 'CUBE'
@@ -244,31 +246,27 @@ class FileImportLocators(bpy.types.Operator, ImportHelper):
     bl_label = 'Import Locators'
     filename_ext = '.p3dxml'
     filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
+        default='*.p3dxml;*.p3d',
         options={'HIDDEN'},
         maxlen=255,
         )
 
+    @profiled
     def execute(self, context):
         LM.import_locators(self.filepath)
         return {'FINISHED'}
 
 
-class FileExportLocators(bpy.types.Operator, ExportHelper):
+class FileExportLocators(bpy.types.Operator, P3DExportHelper):
     bl_idname = 'export_scene.locators_p3dxml'
     bl_label = 'Export Locators'
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
-        options={'HIDDEN'},
-        maxlen=255,
-        )
     selected_only: bpy.props.BoolProperty(
         name='Selected Only',
         description='Only export selected locator objects',
         default=True,
         )
 
+    @profiled
     def execute(self, context):
         if self.selected_only:
             locator_objs = context.selected_objects
@@ -306,6 +304,7 @@ class MDE_OP_locator_create(bpy.types.Operator):
     bl_label = "Create Locator"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         loc_obj = LM.locator_create(location=context.scene.cursor.location)
@@ -319,6 +318,7 @@ class MDE_OP_volume_create_sphere(bpy.types.Operator, volume_filter):
     bl_label = "Add Spherical Volume"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         vol_obj = LM.volume_create(parent=get_cur_locator(context), is_rect=False, location=context.scene.cursor.location)
@@ -332,6 +332,7 @@ class MDE_OP_volume_create_cube(bpy.types.Operator, volume_filter):
     bl_label = "Add Cuboid Volume"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         vol_obj = LM.volume_create(parent=get_cur_locator(context), is_rect=True, location=context.scene.cursor.location)
@@ -346,6 +347,7 @@ class MDE_OP_locator_matrix_create(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         lm_obj = LM.locator_matrix_create(parent=get_cur_locator(context),location=context.scene.cursor.location)
@@ -359,6 +361,7 @@ class MDE_OP_locator_matrix_delete(bpy.types.Operator):
     bl_label = "Delete Locator Matrix"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         cur_loc = get_cur_locator(context)
         cur_loc.select_set(True)
@@ -373,6 +376,7 @@ class MDE_OP_loc_spline_create(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         spline_obj = LM.locator_spline_create(
@@ -393,6 +397,7 @@ class MDE_OP_locator_spline_delete(bpy.types.Operator):
     bl_label = "Delete Locator Spline"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         cur_loc = get_cur_locator(context)
         cur_loc.select_set(True)
@@ -406,6 +411,7 @@ class MDE_OP_loc_cam_create(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
 
+    @profiled
     def execute(self, context):
         cur_loc = get_cur_locator(context)
         bpy.ops.object.select_all(action='DESELECT')
@@ -1,8 +1,9 @@
 import bpy
 from bpy.props import *
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import ImportHelper
 from .PathManager import *
-from .utils_bpy import pcoll
+from .utils_bpy import pcoll, P3DExportHelper
+from .utils_profile import profiled
 from . import utils_math
 
 
@@ -21,11 +22,12 @@ class FileImportPaths(bpy.types.Operator, ImportHelper):
     bl_label = 'Import Paths...'
     filename_ext = '.p3dxml'
     filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
+        default='*.p3dxml;*.p3d',
         options={'HIDDEN'},
         maxlen=255,
     )
 
+    @profiled
     def execute(self, context):
         result = import_paths(self.filepath)
         if result != 'OK':
@@ -35,21 +37,16 @@ class FileImportPaths(bpy.types.Operator, ImportHelper):
             return {'FINISHED'}
 
 
-class FileExportPaths(bpy.types.Operator, ExportHelper):
+class FileExportPaths(bpy.types.Operator, P3DExportHelper):
     bl_idname = 'export_scene.paths_p3dxml'
     bl_label = 'Export Paths...'
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
-        options={'HIDDEN'},
-        maxlen=255
-        )
     selected_only: bpy.props.BoolProperty(
         name='Selected Only',
         description='Only export selected path objects',
         default=False
         )
 
+    @profiled
     def execute(self, context):
         result = None
         if self.selected_only:
@@ -94,6 +91,7 @@ class PathCreateBasic(bpy.types.Operator):
     bl_label = 'Create Basic Path'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.select_all(action='DESELECT')
         cursor_loc = context.scene.cursor.location.copy()
@@ -112,6 +110,7 @@ class PathCreateFromSelectedEdges(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'MESH'
 
+    @profiled
     def execute(self, context):        
         target_obj = context.object
         target_mesh = bpy.types.Mesh(target_obj.data)
@@ -166,6 +165,7 @@ class PathCreateCircular(bpy.types.Operator):
         size=2,
         )
 
+    @profiled
     def execute(self, context):
         path_create_circular(cursor=context.scene.cursor, kwargs=self.as_keywords())
         return {'FINISHED'}
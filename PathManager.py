@@ -18,44 +18,50 @@ def get_paths_collection():
     return paths_collection
 
 
-def import_paths(filepath):
-    bpy.ops.object.select_all(action='DESELECT')
-    root = terra_read(filepath)
-    paths_collection = get_paths_collection()
-    if not find_chunks(root, PAT):
-        return "No path chunks found in the file"
-    for path in find_chunks(root, PAT):
-        locs = []
-        for vert in path.findall('Value/*'):
-            locs.append(item_to_vector(vert).to_4d())
+def path_import(path, paths_collection):
+    """creates path object from Path chunk"""
+    with phase('lookup'):
+        positions = find_positions(path)
+    with phase('new'):
         path_curve = bpy.data.curves.new(name='Path', type='CURVE')
         path_curve.dimensions = '3D'
         path_spline = path_curve.splines.new(type='POLY')
-        path_spline.points.add(len(locs)-1)
-        for i, vert in enumerate(locs):
-            path_spline.points[i].co = vert
+        set_spline_points(path_spline, positions)
         path_object = bpy.data.objects.new('Path', path_curve)
+    with phase('link'):
         paths_collection.objects.link(path_object)
+    path_object.show_wire = True
+    path_object.show_in_front = True
+    return path_object
+
+
+@traced
+@phase('build')
+def import_paths(filepath):
+    bpy.ops.object.select_all(action='DESELECT')
+    paths_collection = get_paths_collection()
+    path_object = None
+    for path in terra_iter(filepath, (PAT,)):
+        path_object = path_import(path, paths_collection)
         path_object.select_set(True)
-        path_object.show_wire = True
-        path_object.show_in_front = True
+    if path_object is None:
+        return "No path chunks found in the file"
     bpy.context.view_layer.objects.active = path_object
     return 'OK'
 
 
+@traced
 def export_paths(filepath, objs):
-    root = p3d_et()
     counter = 0
-    for path in objs:
-        mw = path.matrix_world
-        for path_spline in path.data.splines:
-            chunk = write_chunk(root, PAT)
-            pos = ET.SubElement(chunk, 'Value', Name='Positions')
-            verts = [mw @ x.co for x in path_spline.points]
-            for v in verts:
-                ET.SubElement(pos, 'Item', X=(str(v.x)), Y=(str(v.z)), Z=(str(v.y)))
-            counter += 1
-    write_ET(root, filepath)
+    with p3d_writer(filepath) as w:
+        for path in objs:
+            mw = path.matrix_world
+            for path_spline in path.data.splines:
+                with w.chunk(PAT), w.value('Positions'):
+                    verts = [mw @ x.co for x in path_spline.points]
+                    for v in verts:
+                        w.xyz(None, v.x, v.y, v.z, element='Item')
+                counter += 1
     return counter
 
 def path_create(points, name="Path") -> bpy.types.Object:
@@ -63,9 +69,7 @@ def path_create(points, name="Path") -> bpy.types.Object:
     path_curve = bpy.data.curves.new(name=name, type='CURVE')
     path_curve.dimensions = '3D'
     path_spline = path_curve.splines.new(type='POLY')
-    path_spline.points.add(len(points)-1)
-    for i,p in enumerate(points):
-        path_spline.points[i].co = (p).to_4d()
+    set_spline_points(path_spline, points)
     path_object = bpy.data.objects.new(name, path_curve)
     paths_collection.objects.link(path_object)
     path_object.show_wire = True
@@ -0,0 +1,132 @@
+import bpy
+from bpy_extras.io_utils import ExportHelper
+from datetime import datetime
+from . import utils_profile
+
+
+def max_runs_update(self, context):
+    utils_profile.set_max_runs(self.max_runs)
+
+
+def get_tracing(self):
+    return utils_profile.tracing
+
+
+def set_tracing(self, value):
+    if value:
+        utils_profile.start_tracing()
+    else:
+        utils_profile.stop_tracing()
+
+
+class ProfilePropGroup(bpy.types.PropertyGroup):
+    capture: bpy.props.BoolProperty(
+        name='Capture cProfile',
+        description='Also profile every operator run with cProfile into a .prof file (slows operators down)',
+        default=False,
+    )
+    directory: bpy.props.StringProperty(
+        name='Profiles Directory',
+        description='Where .prof files are saved. Temporary directory if empty',
+        subtype='DIR_PATH',
+    )
+    max_runs: bpy.props.IntProperty(
+        name='Runs Kept',
+        description='Number of last operator runs to keep',
+        default=10,
+        min=1,
+        max=100,
+        update=max_runs_update,
+    )
+    tracing: bpy.props.BoolProperty(
+        name='Record Trace',
+        description='Record import/export phases and functions as trace spans (starting forgets the previous trace)',
+        get=get_tracing,
+        set=set_tracing,
+    )
+
+
+class MDE_OP_profile_clear(bpy.types.Operator):
+    """Forget recorded operator runs"""
+    bl_idname = 'wm.wmde_profile_clear'
+    bl_label = 'Clear Runs'
+
+    def execute(self, context):
+        utils_profile.runs.clear()
+        return {'FINISHED'}
+
+
+class MDE_OP_trace_save(bpy.types.Operator, ExportHelper):
+    """Save recorded trace as Chrome trace event JSON (open it in chrome://tracing or ui.perfetto.dev)"""
+    bl_idname = 'wm.wmde_trace_save'
+    bl_label = 'Save Trace'
+    filename_ext = '.json'
+    filter_glob: bpy.props.StringProperty(default='*.json',
+                                          options={'HIDDEN'},
+                                          maxlen=255)
+
+    @classmethod
+    def poll(cls, context):
+        return bool(utils_profile.trace_events)
+
+    def execute(self, context):
+        count = utils_profile.save_trace(self.filepath)
+        self.report({'INFO'}, f"Saved {count} spans")
+        return {'FINISHED'}
+
+
+class MiscModule:
+    @classmethod
+    def poll(cls, context):
+        return context.preferences.addons[__package__].preferences.MiscEnabled
+
+
+class MDE_PT_Performance(bpy.types.Panel, MiscModule):
+    bl_label = 'Operator Runs'
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'WMDE Performance'
+    bl_order = 0
+
+    def draw_header(self, context):
+        layout = self.layout
+        row = layout.row()
+        row.label(text='', icon='TIME')
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.window_manager.wmde_profile
+        col = layout.column()
+        col.prop(settings, 'max_runs')
+        col.prop(settings, 'capture')
+        if settings.capture:
+            col.prop(settings, 'directory')
+        layout.operator(MDE_OP_profile_clear.bl_idname, icon='TRASH')
+        row = layout.row()
+        row.prop(settings, 'tracing', icon='REC')
+        row.operator(MDE_OP_trace_save.bl_idname, icon='EXPORT')
+        if utils_profile.trace_events:
+            layout.label(text=f"{len(utils_profile.trace_events)} spans recorded")
+        if not utils_profile.runs:
+            layout.label(text='No operator runs yet')
+            return
+        # latest run first
+        for run in reversed(utils_profile.runs):
+            box = layout.box()
+            box.label(text=f"{run.label}: {run.seconds:.3f}s", icon='ERROR' if run.result == 'ERROR' else 'CHECKMARK')
+            box.label(text=f"{datetime.fromtimestamp(run.started):%H:%M:%S}  {run.operator}  {run.result}")
+            phases = [f"{name} {seconds:.3f}s" for name, seconds in run.phases.items() if seconds]
+            if phases:
+                box.label(text=', '.join(phases + [f"other {run.other():.3f}s"]))
+            if run.datablocks:
+                box.label(text=', '.join(f"{delta:+d} {name}" for name, delta in run.datablocks.items()))
+            if run.profile:
+                box.label(text=run.profile, icon='FILE')
+
+
+to_register = [
+    ProfilePropGroup,
+    MDE_OP_profile_clear,
+    MDE_OP_trace_save,
+    MDE_PT_Performance,
+]
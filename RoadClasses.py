@@ -2,12 +2,13 @@ from collections import Counter
 from datetime import date
 import bpy
 from bpy.props import *
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import ImportHelper
 from .utils_bpy import *
+from .utils_profile import profiled
 from . import RoadManager
 from .RoadManager import GetIntersections, GetIntersectionsCollection, inter_create, r_create, rs_create_base
 from math import radians, dist
-from .utils_bpy import pcoll, get_connected_faces, get_connected_verts
+from .utils_bpy import pcoll, get_connected_faces, get_connected_verts, P3DExportHelper
 import mathutils
 import os
 
@@ -85,7 +86,7 @@ class FileImportRoads(bpy.types.Operator, ImportHelper):
     bl_label = 'Import Roads...'
     filename_ext = '.p3dxml'
     filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
+        default='*.p3dxml;*.p3d',
         options={'HIDDEN'},
         maxlen=255,
         )
@@ -95,24 +96,19 @@ class FileImportRoads(bpy.types.Operator, ImportHelper):
         default=True,
         )
 
+    @profiled
     def execute(self, context):
         RoadManager.import_roads_and_intersections(self.filepath, self.try_sort, context)
         return {'FINISHED'}
 
 
-class FileExportRoadsAndIntersects(bpy.types.Operator, ExportHelper):
+class FileExportRoadsAndIntersects(bpy.types.Operator, P3DExportHelper):
     #TODO Export CustomLimits.ini limits
     #TODO Export CustomRoadBehaviour xml(?)
     #TODO "Visible only" checkbox
     #TODO! safety checks (no intersections, no roads, None intersections in roads etc.)
     bl_idname = 'export_scene.roads_p3dxml'
     bl_label = 'Export Roads...'
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(
-        default='*.p3dxml',
-        options={'HIDDEN'},
-        maxlen=255,
-        )
     selected_only: bpy.props.BoolProperty(
         name='Selected Only',
         description='Only export Road Networks that have selected shapes and only selected intersections',
@@ -132,12 +128,14 @@ class FileExportRoadsAndIntersects(bpy.types.Operator, ExportHelper):
 
     def draw(self, context):
         layout = self.layout
+        layout.prop(self, "file_format")
         layout.prop(self, "selected_only")
         layout.prop(self, "safe_check")
         row = layout.row()
         row.prop(self, "connect_margin")
         row.enabled = context.active_operator.properties.safe_check
 
+    @profiled
     def execute(self, context):
         road_cols = []
         inter_objs = []
@@ -152,12 +150,13 @@ class FileExportRoadsAndIntersects(bpy.types.Operator, ExportHelper):
             inter_objs = [x for x in bpy.data.collections['Intersections'].objects if x.users_collection]
         
         if self.safe_check:
-            if RoadManager.invalid_roads(road_cols, inter_objs, self.connect_margin):
-                self.report({'ERROR'}, RoadManager.invalid_roads(
-                    road_cols, inter_objs, self.connect_margin))
+            check = RoadManager.invalid_roads(road_cols, inter_objs, self.connect_margin)
+            if check:
+                self.report({'ERROR'}, check)
                 return {'CANCELLED'}
         self.report({'INFO'}, 'Safe check passed')
-        RoadManager.export_roads_and_intersects(self.filepath, road_cols, inter_objs)
+        parallel = context.preferences.addons[__package__].preferences.ParallelRoadExport
+        RoadManager.export_roads_and_intersects(self.filepath, road_cols, inter_objs, workers=None if parallel else 1)
         self.report(
             {'INFO'}, f"Successfully exported {os.path.basename(self.filepath)}")
         return {'FINISHED'}
@@ -195,11 +194,24 @@ class IntersectCreate(bpy.types.Operator):
         self.location = context.scene.cursor.location
         return self.execute(context)
 
+    @profiled
     def execute(self, context):
         int_obj = RoadManager.inter_create(self.name, self.location, self.radius, self.road_beh, GetIntersectionsCollection(context))
         int_obj.show_name = context.window_manager.intersection_names_visible
         return {'FINISHED'}
 
+class IntersectionsRemoveDrivers(bpy.types.Operator):
+    """Remove radius drivers from intersections made by older versions. Radius is kept as uniform scale"""
+    bl_idname = 'object.intersect_remove_drivers'
+    bl_label = 'Remove Intersection Drivers'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @profiled
+    def execute(self, context):
+        counter = RoadManager.inter_remove_drivers(GetIntersections(context))
+        self.report({'INFO'}, f"Removed drivers from {counter} intersections")
+        return {'FINISHED'}
+
 def is_intersection(object : bpy.types.Object, context):
     return object is not None and object.type == 'EMPTY' and object.empty_display_type == 'SPHERE' and object.users_collection and object.users_collection[0] == GetIntersectionsCollection(context)
 
@@ -231,6 +243,7 @@ class IntersectionsCreateAtFaces(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         target_obj = context.object
         og_mode = str(target_obj.mode)
@@ -284,6 +297,7 @@ class RoadCreate(bpy.types.Operator):
     road_name: bpy.props.StringProperty(name='Base Road Name',default='wzRoadNode')
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         RoadManager.r_create(context, self.road_name)
         return {'FINISHED'}
@@ -295,6 +309,7 @@ class RoadDelete(bpy.types.Operator, RoadEditOperator):
     bl_label = 'Delete This Road Collection'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         bpy.data.collections.remove(get_current_road_collection(context))
         return {'FINISHED'}
@@ -306,6 +321,7 @@ class RoadDuplicate(bpy.types.Operator, RoadEditOperator):
     bl_label = 'Duplicate This Road Collection'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         old_col = get_current_road_collection(context)
         new_col = old_col.copy()
@@ -335,6 +351,7 @@ class RoadCreateAdjacent(bpy.types.Operator, RoadEditOperator): #Dirty macro
     bl_options = {'REGISTER', 'UNDO'}
     direction: bpy.props.BoolProperty(name='To Right', default=True)
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.road_shape_select()
         bpy.ops.object.road_duplicate()
@@ -355,6 +372,7 @@ class RoadSeparate(bpy.types.Operator, RShapeEditOperator):
         else:
             return False
 
+    @profiled
     def execute(self, context):
         new_obj = list(context.selected_objects)
         old_col = get_current_road_collection(context)
@@ -379,6 +397,7 @@ class RoadCreateFromSelectedQuads(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         #Not advised to refactor this inside RoadManager.py
 
@@ -500,9 +519,13 @@ class RoadsAutoConnect(bpy.types.Operator):
         default=0.05
     )
 
+    @profiled
     def execute(self, context):
 
-        inters_dict = {inter : inter.location for inter in GetIntersectionsCollection(context).objects}
+        inter_tree = RoadManager.inter_kdtree(GetIntersectionsCollection(context).objects)
+        if not inter_tree[1]:
+            self.report({'ERROR'}, "No intersections to connect roads to")
+            return {'CANCELLED'}
         
         if self.target_filter == 'ALL':
             target_roads = RoadManager.GetRoadsCollection(context).children
@@ -514,77 +537,22 @@ class RoadsAutoConnect(bpy.types.Operator):
             target_roads = [x for x in RoadManager.GetRoadsCollection(context).children if any([y.select_get() for y in x.objects])]
 
         for road in target_roads:
-            start_shape, end_shape = None, None
-
-            # Edge case: road only has 1 road shape
-            if len(road.objects) == 1:
-                start_shape, end_shape = road.objects[0], road.objects[0]
-                
-                start_co = (start_shape.matrix_world    @ start_shape.data.vertices[0].co   + start_shape.matrix_world  @ start_shape.data.vertices[6].co)/2
-                end_co   = (end_shape.matrix_world      @ end_shape.data.vertices[2].co     + end_shape.matrix_world    @ end_shape.data.vertices[4].co)/2
-
-                #print('-------------DEBUG------------')
-                #print(start_co.xyz)
-                #print(end_co.xyz)
-                # assign inter closest to first road shape as start
-                # assign inter closest to last road shape as end
-                
-                road.road_node_prop.inter_start = sorted(inters_dict.items(), key= lambda x: (x[1]-start_co).length)[0][0]
-                road.road_node_prop.inter_end = sorted(inters_dict.items(), key= lambda x: (x[1]-end_co).length)[0][0]
-                continue
-            
-
-            # get first and last road shapes
-                # count each A and B vert (in world coordinates)
-                # first road shape is shape with A that only appears once
-                # last  road shape is shape with B that only appears once
-            for rshape in road.objects:
-                a_stick, b_stick = False, False # A or B has "sticky" overlapping verts other than themselves
-                a = rshape.matrix_world @ rshape.data.vertices[0].co
-                b = rshape.matrix_world @ rshape.data.vertices[2].co
-
-                for other_rshape in road.objects:
-                    if rshape == other_rshape: continue
-
-                    ao = other_rshape.matrix_world @ other_rshape.data.vertices[0].co
-                    bo = other_rshape.matrix_world @ other_rshape.data.vertices[2].co
-
-                    if (bo-a).length < self.error_margin:
-                        a_stick = True
-                    if (ao-b).length < self.error_margin:
-                        b_stick = True
-                    
-                    #rshape is definitely in the middle
-                    if (a_stick, b_stick) == (True, True):
-                        break
-                        
-                if      (a_stick, b_stick) == (True, True):
-                    continue
-                elif    (a_stick, b_stick) == (True, False):
-                    end_shape = rshape
-                elif    (a_stick, b_stick) == (False, True):
-                    start_shape = rshape
-
-                
-
-            
-            if start_shape is None or end_shape is None:
+            # first and last road shapes of the chain
+            # (edge case: road only has 1 road shape, so it's both)
+            shapes = RoadManager.rs_order(road.objects, self.error_margin)
+            if not shapes:
                 self.report({'ERROR'}, "Some road nodes have been skipped due to error. Check console for details")
                 print(f"Failed to find start/end intersections for {road.name}")
                 continue
-                #return {'CANCELLED'}
-
-            start_co = (start_shape.matrix_world    @ start_shape.data.vertices[0].co   + start_shape.matrix_world  @ start_shape.data.vertices[6].co)/2
-            end_co   = (end_shape.matrix_world      @ end_shape.data.vertices[2].co     + end_shape.matrix_world    @ end_shape.data.vertices[4].co)/2
+            a, _, _, d = RoadManager.rs_evaluate_verts(shapes[0])
+            _, b, c, _ = RoadManager.rs_evaluate_verts(shapes[-1])
+            start_co = (a + d) / 2
+            end_co = (b + c) / 2
 
-            #print('-------------DEBUG------------')
-            #print(start_co.xyz)
-            #print(end_co.xyz)
             # assign inter closest to first road shape as start
             # assign inter closest to last road shape as end
-            
-            road.road_node_prop.inter_start = sorted(inters_dict.items(), key= lambda x: (x[1]-start_co).length)[0][0]
-            road.road_node_prop.inter_end = sorted(inters_dict.items(), key= lambda x: (x[1]-end_co).length)[0][0]
+            road.road_node_prop.inter_start = RoadManager.nearest_inter(inter_tree, start_co)
+            road.road_node_prop.inter_end = RoadManager.nearest_inter(inter_tree, end_co)
 
         #self.report({'WARNING'}, "WIP")
         return {'FINISHED'}
@@ -658,6 +626,7 @@ class RShapeSelect(bpy.types.Operator):
         else:
             return get_current_road_collection(context).road_node_prop.to_export and get_current_road_collection(context).objects
 
+    @profiled
     def execute(self, context):
         if all([x.select_get() for x in get_current_road_collection(context).objects]):
             n_des = False
@@ -678,6 +647,7 @@ class RShapeUpdate(bpy.types.Operator, RShapeEditOperator):
     def poll(cls, context):
         return context.mode == 'OBJECT'
 
+    @profiled
     def execute(self, context):
         if context.active_object.type != 'MESH' or (len(context.active_object.users_collection) > 1) or (not context.active_object.users_collection[0].road_node_prop.to_export):
             self.report({'ERROR'}, "Please change active object to a valid road shape object")
@@ -735,6 +705,7 @@ class RShapeCreateElliptic(bpy.types.Operator, RShapeAddOperator):
         subtype='XYZ',
         unit='LENGTH')
 
+    @profiled
     def execute(self, context):
         RoadManager.rs_create_ellip(get_current_road_collection(context), self.as_keywords())
         return {'FINISHED'}
@@ -784,6 +755,7 @@ class RShapeCreateStraight(bpy.types.Operator, RShapeAddOperator):
         self.loc_z = context.scene.cursor.location.z
         return self.execute(context)
 
+    @profiled
     def execute(self, context):
         RoadManager.rs_create_straight(get_current_road_collection(context), context, self.as_keywords())
         return {'FINISHED'}
@@ -795,6 +767,7 @@ class RShapePrepareCurve(bpy.types.Operator, RShapeAddOperator):
     bl_label = 'Prepare Bezier Road'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         curve_obj = RoadManager.misc_create_bezier(context)
         get_current_road_collection(context).objects.link(curve_obj)
@@ -832,6 +805,7 @@ class RShapeFinalizeCurve(bpy.types.Operator):
     def poll(cls, context):
         return ContextIsRCurve(context)
 
+    @profiled
     def execute(self, context):
         bpy.ops.object.mode_set(mode='OBJECT')
         RoadManager.rs_create_from_bezier(context)
@@ -845,6 +819,7 @@ class RShapeShiftAdjacent(bpy.types.Operator, RShapeEditOperator):
     direction: bpy.props.BoolProperty(name='To Right',
                                       default=True)
 
+    @profiled
     def execute(self, context):
         objects = context.selected_objects
         for obj in objects:
@@ -862,6 +837,7 @@ class RShapeShift(bpy.types.Operator, RShapeEditOperator):
     bl_options = {'REGISTER', 'UNDO'}
     distance: bpy.props.FloatProperty(name='Distance', subtype='DISTANCE', unit='LENGTH')
 
+    @profiled
     def execute(self, context):
         objects = context.selected_objects
         objl = len(objects)
@@ -894,6 +870,7 @@ class RShapeAdjustWidth(bpy.types.Operator, RShapeEditOperator):
     ]
     pivot: bpy.props.EnumProperty(items=pivots, name="pivot side", default='CENTER')
 
+    @profiled
     def execute(self, context):
         objects = context.selected_objects
         for obj in objects:
@@ -912,6 +889,7 @@ class RShapeSubdiv(bpy.types.Operator, RShapeEditOperator):
 
     number_cuts: bpy.props.IntProperty(name='Number of Cuts', default=1, min=1, soft_max=24)
 
+    @profiled
     def execute(self, context):
         for shape_obj in context.selected_objects:
             for new_rs in RoadManager.rs_edit_subdiv(shape_obj, self.number_cuts+1):
@@ -926,6 +904,7 @@ class RShapeFlip(bpy.types.Operator, RShapeEditOperator):
     bl_label = 'Flip Direction'
     bl_options = {'REGISTER', 'UNDO'}
 
+    @profiled
     def execute(self, context):
         cur_col = get_current_road_collection(context)
         all_shapes_selected = all([x.select_get() for x in cur_col.objects])
@@ -987,12 +966,13 @@ class MDE_PT_Intersections(bpy.types.Panel, RoadModule):
         layout = self.layout
         layout.operator(IntersectCreate.bl_idname, icon='PLUS')
         layout.operator(IntersectionsCreateAtFaces.bl_idname, icon='FACESEL')
+        layout.operator(IntersectionsRemoveDrivers.bl_idname, icon='DRIVER')
         if context.window_manager.intersection_names_visible:
             layout.prop(context.window_manager, "intersection_names_visible", text="Intersection Names ON", icon='HIDE_OFF')
         else:
             layout.prop(context.window_manager, "intersection_names_visible", text="Intersection Names OFF", icon='HIDE_ON')
         if context.object and is_intersection(context.object, context):
-            layout.prop(context.object, 'scale', index=0, text='Radius')
+            layout.prop(context.object, 'inter_radius', text='Radius')
             layout.prop(context.object, 'inter_road_beh')
 
 
@@ -1099,6 +1079,7 @@ to_register = [
     FileImportRoads,
     IntersectCreate,
     IntersectionsCreateAtFaces,
+    IntersectionsRemoveDrivers,
     MDE_PT_Intersections,
     MDE_PT_RoadFileManagement,
     MDE_PT_RoadShapes,
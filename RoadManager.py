@@ -1,10 +1,16 @@
-from math import pi
+from math import pi, floor
 from time import time
+from concurrent.futures.process import BrokenProcessPool
+import os
 import bpy
 import bmesh
 import bpy_extras.object_utils
+from bpy.app.handlers import persistent
+import numpy as np
 from . import utils_math
 from .utils_p3dxml import *
+from mathutils.kdtree import KDTree
+from . import utils_road_encoder
 add_object = bpy_extras.object_utils.object_data_add
 
 def GetRoadsCollection(context) -> bpy.types.Collection:
@@ -30,28 +36,68 @@ def GetIntersections(context) -> list:
 
 
 def inter_create(inter_name, position, radius, behaviour, int_col : bpy.types.Collection) -> bpy.types.Object:
-    inter = bpy.data.objects.new(inter_name, None)
+    with phase('new'):
+        inter = bpy.data.objects.new(inter_name, None)
     inter.inter_road_beh = behaviour
     inter.empty_display_type = 'SPHERE'
-    ad = inter.animation_data_create()
-    dr = ad.drivers.new('empty_display_size')
-    dr.driver.type = 'SCRIPTED'
-    dr.driver.expression = '1'
-    dsy = ad.drivers.new('scale', index=1)
-    dsy.driver.type = 'SCRIPTED'
-    dsy.driver.use_self = True
-    dsy.driver.expression = 'self.scale[0]'
-    dsz = ad.drivers.new('scale', index=2)
-    dsz.driver.type = 'SCRIPTED'
-    dsz.driver.use_self = True
-    dsz.driver.expression = 'self.scale[0]'
+    inter.empty_display_size = 1
     inter.location = position
-    inter.scale[0] = radius
+    # radius is uniform scale, see inter_radius
+    inter.scale = (radius, radius, radius)
     #int_col = GetIntersectionsCollection(bpy.context)
-    int_col.objects.link(inter)
+    with phase('link'):
+        int_col.objects.link(inter)
     return inter
 
 
+def inter_kdtree(inter_objs):
+    """returns (KDTree of intersection locations, list of intersections) for nearest_inter lookups. build once, query many times"""
+    inter_objs = list(inter_objs)
+    tree = KDTree(len(inter_objs))
+    for i, inter in enumerate(inter_objs):
+        tree.insert(inter.location, i)
+    tree.balance()
+    return tree, inter_objs
+
+
+def nearest_inter(inter_tree, co):
+    """returns intersection closest to co from inter_kdtree result (None if there are no intersections)"""
+    tree, inter_objs = inter_tree
+    index = tree.find(co)[1]
+    return None if index is None else inter_objs[index]
+
+
+def get_inter_radius(inter):
+    return inter.scale[0]
+
+
+def set_inter_radius(inter, value):
+    inter.scale = (value, value, value)
+
+
+INTER_DRIVER_PATHS = {'empty_display_size', 'scale'}
+
+
+def inter_remove_drivers(inter_objs) -> int:
+    """removes radius drivers older versions added to intersections, keeping radius as uniform scale. returns number of intersections changed"""
+    counter = 0
+    for inter in inter_objs:
+        ad = inter.animation_data
+        if ad is None:
+            continue
+        drivers = [dr for dr in ad.drivers if dr.data_path in INTER_DRIVER_PATHS]
+        if not drivers:
+            continue
+        for dr in drivers:
+            ad.drivers.remove(dr)
+        inter.empty_display_size = 1
+        set_inter_radius(inter, get_inter_radius(inter))
+        if not ad.drivers and ad.action is None and not ad.nla_tracks:
+            inter.animation_data_clear()
+        counter += 1
+    return counter
+
+
 def r_create(context, road_name = "RoadCollection") -> bpy.types.Collection:
     """create a road collection and make it active"""
     road_col = GetRoadsCollection(context)
@@ -89,21 +135,49 @@ def r_import(name, start_inter, end_inter, lanes, max_cars, speed, intel, short,
     return col
 
 
+ROAD_SHAPE_FACES = [(0, 1, 3, 7), (1, 2, 3), (3, 4, 5), (3, 5, 6, 7)]
+
+
+def rs_layout(corners):
+    """takes (N, 4, 3) array of Road Shape corners (a, b, c, d). returns (N, 8, 3) array of their verts relative to a, with midpoints"""
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 4, 3)
+    rel = corners - corners[:, :1]
+    verts = np.empty((len(rel), 8, 3))
+    verts[:, ::2] = rel
+    verts[:, 1::2] = (rel + np.roll(rel, -1, axis=1)) / 2
+    return verts
+
+
+def rs_create_bulk(collections, corners, names):
+    """create Road Shapes at once from (N, 4, 3) array of corners, collections and names are per shape. returns list of objects.
+    Every mesh is a copy of one template mesh, so only vert positions are set per shape"""
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 4, 3)
+    # relative to the first corner, so float32 (what mesh verts store) loses nothing
+    verts = rs_layout(corners).astype(np.float32).reshape(len(corners), -1)
+    template = bpy.data.meshes.new('RoadShape')
+    template.from_pydata([(0, 0, 0)] * 8, [], ROAD_SHAPE_FACES)
+    objs = []
+    for collection, loc, co, name in zip(collections, corners[:, 0], verts, names):
+        with phase('new'):
+            M = template.copy()
+            M.name = name
+            M.vertices.foreach_set('co', co)
+            M.update()
+            r_obj = bpy.data.objects.new(name, M)
+        r_obj.location = loc
+        with phase('link'):
+            collection.objects.link(r_obj)
+        r_obj.show_in_front = True
+        r_obj.display_type = 'WIRE'
+        r_obj.show_all_edges = True
+        objs.append(r_obj)
+    bpy.data.meshes.remove(template)
+    return objs
+
+
 def rs_create_base(collection, a=None, b=None, c=None, d=None, name='RoadShape'):
     """create basic Road Shape with verts at (a,b,c,d)"""
-    M = bpy.data.meshes.new(name)
-    loc = a
-    r_v = [Vector(), (b - a) / 2, b - a, b + (c - b) / 2 - a, c - a, c + (d - c) / 2 - a, d - a, d + (a - d) / 2 - a]
-    r_f = [(0, 1, 3, 7), (1, 2, 3), (3, 4, 5), (3, 5, 6, 7)]
-    M.from_pydata(r_v, [], r_f)
-    M.update()
-    r_obj = bpy.data.objects.new(name, M)
-    r_obj.location = loc
-    collection.objects.link(r_obj)
-    r_obj.show_in_front = True
-    r_obj.display_type = 'WIRE'
-    r_obj.show_all_edges = True
-    return r_obj
+    return rs_create_bulk([collection], [(a, b, c, d)], [name])[0]
 
 
 def rs_create_straight(collection, context, kwargs):
@@ -112,13 +186,13 @@ def rs_create_straight(collection, context, kwargs):
                                         resolution=(kwargs['resolution']),
                                         width=(kwargs['width']),
                                         length=(kwargs['length']))
-    for i, vvvv in enumerate(points):
-        rs_create_base(collection, *vvvv, name=f"StraightRoadShape{i}")
+    points = list(points)
+    rs_create_bulk([collection] * len(points), points, [f"StraightRoadShape{i}" for i in range(len(points))])
 
 
 def rs_create_ellip(collection, args):
-    for i, vvvv in enumerate((utils_math.build_arc)(**args, **{'origin': bpy.context.scene.cursor})):
-        rs_create_base(collection, *vvvv, **{'name': f"EllipticRoadShape{i}"})
+    points = list((utils_math.build_arc)(**args, **{'origin': bpy.context.scene.cursor}))
+    rs_create_bulk([collection] * len(points), points, [f"EllipticRoadShape{i}" for i in range(len(points))])
 
 
 def rs_create_from_bezier(context):
@@ -127,8 +201,7 @@ def rs_create_from_bezier(context):
     leftover_mesh = context.object
     points = bpy.context.selected_objects[0].data.vertices
     points = utils_math.curve_mesh_to_road([x.co for x in points])
-    for shape in points:
-        rs_create_base(context.object.users_collection[0], *shape)
+    rs_create_bulk([context.object.users_collection[0]] * len(points), points, ['RoadShape'] * len(points))
 
     bpy.data.objects.remove(leftover_mesh)
 
@@ -173,6 +246,7 @@ def rs_edit_upd(obj):
         obj.data.vertices[i].co = verts[i]
 
     obj.data.update()
+    rs_forget_verts(obj)
 
 
 def rs_edit_width(shape_obj, delta, pivot):
@@ -196,24 +270,18 @@ def rs_edit_flip(shape_obj):
     rs_edit_upd(shape_obj)
 
 def rs_edit_subdiv(shape_obj : bpy.types.Object, number_cuts):
-    new_shapes = []
     rs_edit_upd(shape_obj)
     col = shape_obj.users_collection[0]
-    mw = shape_obj.matrix_world
-    old_vert_pos = [mw @ shape_obj.data.vertices[i].co.copy() for i in [0,2,4,6]]
+    old_vert_pos = rs_evaluate_verts(shape_obj)
     delta_l = (old_vert_pos[1] - old_vert_pos[0])/(number_cuts)
     delta_r = (old_vert_pos[2] - old_vert_pos[3])/(number_cuts)
-    for i in range(number_cuts):
-        new_shapes.append(
-            rs_create_base(
-                col, 
-                old_vert_pos[0]+delta_l*i, 
-                old_vert_pos[0]+delta_l*(i+1), 
-                old_vert_pos[3]+delta_r*(i+1), 
-                old_vert_pos[3]+delta_r*i,
-                )
-        )
-    return new_shapes
+    corners = [(
+        old_vert_pos[0]+delta_l*i,
+        old_vert_pos[0]+delta_l*(i+1),
+        old_vert_pos[3]+delta_r*(i+1),
+        old_vert_pos[3]+delta_r*i,
+        ) for i in range(number_cuts)]
+    return rs_create_bulk([col] * number_cuts, corners, ['RoadShape'] * number_cuts)
 
 def rs_edit_shift_adjacent(shape_obj, direction=False):
     rs_edit_upd(shape_obj)
@@ -235,190 +303,420 @@ def rs_edit_shift(shape_obj, distance):
     rs_edit_upd(shape_obj)
 
 
+# {object pointer: frozen world space corners}, see rs_evaluate_verts
+rs_corners_cache = {}
+
+
 def rs_evaluate_verts(road_shape):
-    """Takes road shape mesh object. returns list of verts in global space"""
+    """Takes road shape mesh object. returns list of corner verts (0, 2, 4, 6) in global space.
+    Corners are cached until the shape changes (rs_edit_* functions and road_depsgraph_update forget them).
+    Edits made by scripts (or in background mode) don't run road_depsgraph_update, call road_validation.invalidate after those"""
+    key = road_shape.as_pointer()
+    cached = rs_corners_cache.get(key)
+    if cached is not None:
+        return list(cached)
     locs = []
     for i in [0, 2, 4, 6]:
-        locs.append(road_shape.matrix_world @ road_shape.data.vertices[i].co)
+        locs.append((road_shape.matrix_world @ road_shape.data.vertices[i].co).freeze())
+    rs_corners_cache[key] = tuple(locs)
     return locs
 
 
+def rs_forget_verts(road_shape):
+    """drops cached corners of road shape, call after editing it"""
+    rs_corners_cache.pop(road_shape.as_pointer(), None)
+
+
+# cells around (and including) a spatial hash cell
+HASH_NEIGHBOURS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+
+
+def rs_order(shapes, error_margin=0.05):
+    """returns road shapes ordered from first to last, each shape's B vert (2) matching next shape's A vert (0) within error_margin.
+    returns None if shapes don't form a single chain"""
+    shapes = list(shapes)
+    if len(shapes) <= 1:
+        return shapes
+    corners = [rs_evaluate_verts(x) for x in shapes]
+    # A verts hashed into cells of error_margin size, so any match is in a neighbouring cell
+    cell = max(error_margin, 1e-6)
+    def cell_of(v):
+        return (floor(v.x / cell), floor(v.y / cell), floor(v.z / cell))
+    grid = {}
+    for i, (a, b, c, d) in enumerate(corners):
+        grid.setdefault(cell_of(a), []).append(i)
+
+    next_shape = [None] * len(shapes)
+    has_prev = [False] * len(shapes)
+    for i, (a, b, c, d) in enumerate(corners):
+        x, y, z = cell_of(b)
+        for dx, dy, dz in HASH_NEIGHBOURS:
+            for j in grid.get((x + dx, y + dy, z + dz), ()):
+                if j != i and (corners[j][0] - b).length < error_margin:
+                    next_shape[i] = j
+                    has_prev[j] = True
+                    break
+            if next_shape[i] is not None:
+                break
+
+    starts = [i for i in range(len(shapes)) if not has_prev[i] and next_shape[i] is not None]
+    if len(starts) != 1:
+        return None
+    order = [starts[0]]
+    while next_shape[order[-1]] is not None and len(order) <= len(shapes):
+        order.append(next_shape[order[-1]])
+    if len(order) != len(shapes) or len(set(order)) != len(shapes):
+        return None
+    return [shapes[i] for i in order]
+
+
+@traced
+@phase('build')
 def import_roads_and_intersections(filepath, try_sort, context):
-    root = terra_read(filepath)
-    intersections_collection = GetIntersectionsCollection(context if context else bpy.context)
-    import_intersects(root, intersections_collection)
-    all_roads_collection = GetRoadsCollection(context if context else bpy.context)
-    import_roads(root, try_sort, all_roads_collection)
-
-
-def import_roads(root, try_sort, all_roads_collection):
+    context = context if context else bpy.context
+    intersections_collection = GetIntersectionsCollection(context)
+    all_roads_collection = GetRoadsCollection(context)
+    road_shapes = {}
+    roads = []
+    for chunk in terra_iter(filepath, (INS, RDS, ROA)):
+        chunk_type = chunk.get('Type')
+        if chunk_type == INS:
+            import_intersect(chunk, intersections_collection)
+        elif chunk_type == RDS:
+            road_shapes[find_val(chunk, 'Name')] = read_road_shape(chunk)
+        else:
+            roads.append(read_road(chunk))
+    # roads can only be built once every intersection and road shape has been read
+    build_roads(roads, road_shapes, try_sort, all_roads_collection)
+
+
+@phase('lookup')
+def read_road_shape(road_shape):
+    """returns (lanes, position, position2, position3) of Road Data Segment chunk"""
+    return (int(find_val(road_shape, 'Lanes')),
+            find_xyz(road_shape, 'Position'),
+            find_xyz(road_shape, 'Position2'),
+            find_xyz(road_shape, 'Position3'))
+
+
+@phase('lookup')
+def read_road(road):
+    """returns dictionary of Road chunk properties with segments as list of (road shape name, location)"""
+    return {
+        'name': find_val(road, 'Name'),
+        'start_inter': find_val(road, 'StartIntersectionLocatorNode'),
+        'end_inter': find_val(road, 'EndIntersectionLocatorNode'),
+        'max_cars': int(find_val(road, 'MaximumCars')),
+        'speed': int(find_val(road, 'Unknown2')),
+        'intel': int(find_val(road, 'Unknown3')),
+        'unknown': int(find_val(road, 'Unknown4')),
+        'noreset': int(find_val(road, 'NoReset')),
+        'segments': [(find_val(road_seg, 'CubeShape'), find_xyz_from_transform_mat(road_seg)) for road_seg in find_chunks(road, RSG)],
+    }
+
+
+@traced
+def build_roads(roads, road_shapes, try_sort, all_roads_collection):
+    """creates road collections and road shapes from read_road and read_road_shape results"""
     #time_start = time()
     road_counter = 0
     road_shape_counter = 0
-    all_road_shapes = chunks_to_dict_by_name(find_chunks(root, RDS))
-    all_roads = find_chunks(root, ROA)
-    for road in all_roads:
+    shape_cols, shape_names, origins, offsets = [], [], [], []
+    for road in roads:
         road_counter += 1
-        r_name = find_val(road, 'Name')
-        start_inter = find_val(road, 'StartIntersectionLocatorNode')
-        end_inter = find_val(road, 'EndIntersectionLocatorNode')
-        max_cars = int(find_val(road, 'MaximumCars'))
-        speed = int(find_val(road, 'Unknown2'))
-        intel = int(find_val(road, 'Unknown3'))
-        unkown = int(find_val(road, 'Unknown4'))
-        noreset = int(find_val(road, 'NoReset'))
         lanes = False
-        r_col = r_import(r_name, start_inter, end_inter, 2, max_cars, speed, intel, noreset, unkown, all_roads_collection, try_sort=try_sort)
-        for road_seg in find_chunks(road, RSG):
+        r_col = r_import(road['name'], road['start_inter'], road['end_inter'], 2, road['max_cars'], road['speed'], road['intel'], road['noreset'], road['unknown'], all_roads_collection, try_sort=try_sort)
+        for road_seg_name, a in road['segments']:
             road_shape_counter += 1
-            road_seg_name = find_val(road_seg, 'CubeShape')
-            a = find_xyz_from_transform_mat(road_seg)
-            b = a + find_xyz(all_road_shapes[road_seg_name], 'Position')
-            c = a + find_xyz(all_road_shapes[road_seg_name], 'Position2')
-            d = a + find_xyz(all_road_shapes[road_seg_name], 'Position3')
+            shape_lanes, b, c, d = road_shapes[road_seg_name]
             if not lanes:
-                lanes = int(find_val(all_road_shapes[road_seg_name], 'Lanes'))
-            rs_create_base(r_col, a, b, c, d, name=road_seg_name)
+                lanes = shape_lanes
+            shape_cols.append(r_col)
+            shape_names.append(road_seg_name)
+            origins.append(a)
+            offsets.append(((0, 0, 0), b, c, d))
 
         r_col.road_node_prop.lanes = lanes
 
+    # every road shape of every road is created in one go
+    if shape_names:
+        corners = np.asarray(origins, dtype=np.float64)[:, None] + np.asarray(offsets, dtype=np.float64)
+        rs_create_bulk(shape_cols, corners, shape_names)
+
     #print(f"Imported {road_counter} Roads and {road_shape_counter} Road Shapes in {time() - time_start:.3f} seconds")
 
 
+@traced
+def import_roads(root, try_sort, all_roads_collection):
+    road_shapes = {find_val(x, 'Name'): read_road_shape(x) for x in find_chunks(root, RDS)}
+    build_roads([read_road(x) for x in find_chunks(root, ROA)], road_shapes, try_sort, all_roads_collection)
+
+
+def import_intersect(inter, intersections_collection):
+    with phase('lookup'):
+        name = find_val(inter, 'Name')
+        pos = find_xyz(inter, 'Position')
+        rad = float(find_val(inter, 'Radius'))
+        beh = int(find_val(inter, 'TrafficBehaviour'))
+    if name not in bpy.data.objects:
+        return inter_create(name, pos, rad, beh, intersections_collection)
+
+
+@traced
 def import_intersects(root, intersections_collection):
     #time_start = time()
     #inter_counter = 0
     for i in find_chunks(root, INS):
         #inter_counter += 1
-        name = find_val(i, 'Name')
-        pos = find_xyz(i, 'Position')
-        rad = float(find_val(i, 'Radius'))
-        beh = int(find_val(i, 'TrafficBehaviour'))
-        if name not in bpy.data.objects:
-            inter_create(name, pos, rad, beh, intersections_collection)
+        import_intersect(i, intersections_collection)
 
     #print(f"Imported {inter_counter} Intersections in {time() - time_start:.3f} seconds")
 
 
 def invalid_roads(road_cols, inter_objs, margin):
-    print("\tChecking intersection validity")
-    check = roads_have_invalid_intersections(road_cols)
-    if check:
-        return check
-    print("\tChecking graph validity")
-    check = roads_are_disconnected(road_cols, inter_objs)
-    if check:
-        return check
-    #print("\tChecking connection validity")
-    #check = roads_improperly_connected(road_cols, margin)
-    if check:
-        return check
-    return False
+    """returns report of the first failed network check, False if network is valid. only roads changed since the last call are checked again"""
+    return road_validation.validate(road_cols, inter_objs, margin)
+
+
+class RoadValidationCache:
+    """Remembers check results of each road collection, so only roads changed since the last check are validated again.
+    Changed roads are marked dirty by road_depsgraph_update. That doesn't run for edits made by scripts (or in background mode),
+    call invalidate after those. Results are also dropped when a road's key (see road_key) changes"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.road_results = {}  # road collection name -> {check name: failed}
+        self.inter_roads = {}  # intersection name -> names of road collections using it
+        self.dirty = set()  # road collection names
+        self.graph_key = None
+        self.graph_result = False
+        self.margin = None
+
+    def mark_dirty(self, id_data):
+        if isinstance(id_data, bpy.types.Collection):
+            self.graph_key = None
+            if id_data.road_node_prop.to_export:
+                self.dirty.add(id_data.name)
+            else:
+                # intersections (or whole roads) were added or removed
+                self.road_results.clear()
+        elif isinstance(id_data, bpy.types.Object):
+            self.dirty.update(x.name for x in id_data.users_collection)
+            if id_data.name in self.inter_roads:
+                self.dirty.update(self.inter_roads[id_data.name])
+                self.graph_key = None
+
+    def invalidate(self, road_cols=None):
+        """marks road_cols (every road if None) to be checked again and forgets corners of their shapes,
+        call after editing roads from a script"""
+        self.graph_key = None
+        if road_cols is None:
+            self.road_results.clear()
+            rs_corners_cache.clear()
+        else:
+            self.dirty.update(x.name for x in road_cols)
+            for road_col in road_cols:
+                for obj in road_col.objects:
+                    rs_forget_verts(obj)
+
+    @staticmethod
+    def road_key(road_col):
+        """returns pointers of road_col, its intersections and road shapes. Changes inside them are tracked by the dirty set"""
+        props = road_col.road_node_prop
+        return (road_col.as_pointer(), tuple(None if x is None else x.as_pointer() for x in (props.inter_start, props.inter_end)),
+                tuple(x.as_pointer() for x in road_col.objects))
+
+    def check_roads(self, road_cols, margin, keys):
+        """runs every per road check on road_cols at once, keys are their road_key by name"""
+        for road_col in road_cols:
+            props = road_col.road_node_prop
+            for inter in (props.inter_start, props.inter_end):
+                if inter is not None:
+                    self.inter_roads.setdefault(inter.name, set()).add(road_col.name)
+        connection = road_connection_report(road_cols, margin)
+        for road_col in road_cols:
+            self.road_results[road_col.name] = {
+                'key': keys[road_col.name],
+                'intersections': road_has_invalid_intersections(road_col),
+                'connection': connection.get(road_col.name),
+            }
+            self.dirty.discard(road_col.name)
+
+    def validate(self, road_cols, inter_objs, margin):
+        if margin != self.margin:
+            self.road_results.clear()
+            self.margin = margin
+        keys = {x.name: self.road_key(x) for x in road_cols}
+        changed = [x for x in road_cols if x.name in self.dirty or self.road_results.get(x.name, {}).get('key') != keys[x.name]]
+        self.check_roads(changed, margin, keys)
+
+        failed = [x.name for x in road_cols if self.road_results[x.name]['intersections']]
+        if failed:
+            return 'Following road nodes have invalid intersections ' + ', '.join(failed)
+        # edges of the graph are the intersection names of each road
+        graph_key = (tuple((x.name, getattr(x.road_node_prop.inter_start, 'name', None), getattr(x.road_node_prop.inter_end, 'name', None)) for x in road_cols),
+                     tuple(x.name for x in inter_objs))
+        if graph_key != self.graph_key:
+            self.graph_result = roads_are_disconnected(road_cols, inter_objs)
+            self.graph_key = graph_key
+        if self.graph_result:
+            return self.graph_result
+        return format_connection_report({x.name: self.road_results[x.name]['connection'] for x in road_cols if self.road_results[x.name]['connection']})
+
+
+road_validation = RoadValidationCache()
+
+
+@persistent
+def road_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        if isinstance(id_data, bpy.types.Object):
+            rs_forget_verts(id_data)
+        road_validation.mark_dirty(id_data)
+
+
+@persistent
+def road_cache_reset(*args):
+    rs_corners_cache.clear()
+    road_validation.clear()
+
+
+# (handler list, handler) pairs added on register
+road_handlers = [
+    (bpy.app.handlers.depsgraph_update_post, road_depsgraph_update),
+    (bpy.app.handlers.load_post, road_cache_reset),
+    (bpy.app.handlers.undo_post, road_cache_reset),
+    (bpy.app.handlers.redo_post, road_cache_reset),
+]
 
 
 def roads_are_disconnected(road_cols, inter_objs):
-    graph = {}
-    for inter in inter_objs:
-        nbrs = set()
-        for node in [x for x in road_cols if inter in [x.road_node_prop.inter_start, x.road_node_prop.inter_end]]:
-            if inter.name == node.road_node_prop.inter_start:
-                nbrs.add(node.road_node_prop.inter_end.name)
-            else:
-                nbrs.add(node.road_node_prop.inter_start.name)
+    """returns report of every island of intersections disconnected from the largest one, False if the network is connected"""
+    edges = []
+    for node in road_cols:
+        inter_start, inter_end = node.road_node_prop.inter_start, node.road_node_prop.inter_end
+        if inter_start is not None and inter_end is not None:
+            edges.append((inter_start.name, inter_end.name))
+    islands = utils_math.connected_components([x.name for x in inter_objs], edges)
+    if len(islands) <= 1:
+        return False
+    return f'The following {len(islands) - 1} island(s) are disconnected from the rest of the network:\n' + '\n'.join(', '.join(sorted(x)) for x in islands[1:])
 
-        graph[inter.name] = nbrs
 
-    if utils_math.is_connected(graph):
-        return False
-    else:
-        return 'The following island is disconnected from the rest of the network: ' + utils_math.is_connected(graph)
+def road_has_invalid_intersections(rc):
+    return rc.road_node_prop.inter_start is None or rc.road_node_prop.inter_end is None or rc.road_node_prop.inter_start.name == rc.road_node_prop.inter_end.name
 
 
 def roads_have_invalid_intersections(road_cols):
-    invalid_roads = []
-    for rc in road_cols:
-        if rc.road_node_prop.inter_start is None or rc.road_node_prop.inter_end is None or rc.road_node_prop.inter_start.name == rc.road_node_prop.inter_end.name:
-            invalid_roads.append(rc.name)
+    invalid_roads = [rc.name for rc in road_cols if road_has_invalid_intersections(rc)]
     if not invalid_roads:
         return False
     return str('Following road nodes have invalid intersections ' + ', '.join(invalid_roads))
 
 
-def roads_improperly_connected(road_cols, margin=1.5):
-    #TODO fix this shitty validity checker
-    faulty_nodes = {}
-    for node in road_cols:
-        all_verts = []
-        connected = [0, 0]
-        int_start = node.road_node_prop.inter_start
-        int_end = node.road_node_prop.inter_end
-        for x in node.objects:
-            all_verts += rs_evaluate_verts(x)
-
-        for x in all_verts:
-            if (x - int_start.location).length <= int_start.scale[0] + margin:
-                connected[0] += 1
-                if (x - int_start.location).length - int_start.scale[0] > margin:
-                    margin = (x - int_start.location).length - int_start.scale[0]
-
-        for x in all_verts:
-            if (x - int_end.location).length <= int_end.scale[0] + margin:
-                connected[1] += 1
-                if (x - int_end.location).length - int_end.scale[0] > margin:
-                    margin = (x - int_end.location).length - int_end.scale[0]
-
-        if connected != [2, 2]:
-            if connected[0] < 2:
-                faulty_nodes[node.name] = ' @ Start Intersection'
-            elif connected[1] < 2:
-                faulty_nodes[node.name] = ' @ End Intersection'
-            elif connected[0] < 2 and connected[1] < 2:
-                faulty_nodes[node.name] = ' @ Both Start and End Intersections'
-
-    if not faulty_nodes:
+def rs_corners_array(shapes):
+    """returns (S, 4, 3) array of world space corners (verts 0, 2, 4, 6) of road shapes"""
+    return np.array([rs_evaluate_verts(x) for x in shapes], dtype=np.float64).reshape(-1, 4, 3)
+
+
+def road_connection_report(road_cols, margin=1.5):
+    """returns {road name: 'Start', 'End' or 'Both Start and End'} for roads with less than 2 road shape corners
+    within radius + margin of their start/end intersection. roads with invalid intersections are skipped"""
+    road_cols = [x for x in road_cols if not road_has_invalid_intersections(x)]
+    shapes, shape_roads = [], []
+    for i, node in enumerate(road_cols):
+        shapes += node.objects
+        shape_roads += [i] * len(node.objects)
+    if not road_cols:
+        return {}
+    corners = rs_corners_array(shapes)
+    shape_roads = np.asarray(shape_roads, dtype=np.int64)
+    connected = []
+    for inter_prop in ('inter_start', 'inter_end'):
+        inters = [getattr(x.road_node_prop, inter_prop) for x in road_cols]
+        locs = np.array([x.location for x in inters]).reshape(-1, 3)
+        limits = np.array([x.scale[0] for x in inters]) + margin
+        dist = np.linalg.norm(corners - locs[shape_roads][:, None], axis=2)
+        near = (dist <= limits[shape_roads][:, None]).sum(axis=1)
+        connected.append(np.bincount(shape_roads, weights=near, minlength=len(road_cols)) >= 2)
+    labels = {(False, True): 'Start', (True, False): 'End', (False, False): 'Both Start and End'}
+    return {node.name: labels[(bool(s), bool(e))] for node, s, e in zip(road_cols, *connected) if not (s and e)}
+
+
+def format_connection_report(report):
+    if not report:
         return False
-    else:
-        faulty_nodes = '\n'.join([x + str(faulty_nodes.get(x)) for x in faulty_nodes])
-        return str(f"Following road nodes are not properly connected to their corresponding intersection(s):\n{faulty_nodes}")
+    faulty_nodes = '\n'.join(f"{name} @ {where} Intersection{'s' if where.startswith('Both') else ''}" for name, where in report.items())
+    return str(f"Following road nodes are not properly connected to their corresponding intersection(s):\n{faulty_nodes}")
 
 
-def export_roads_and_intersects(filepath, road_cols, inter_objs):
-    root = p3d_et()
-    for inter_ob in inter_objs:
-        inter_et = write_chunk(root, INS)
-        write_val(inter_et, 'Name', inter_ob.name)
-        write_xyz(inter_et, 'Position', *inter_ob.location)
-        write_val(inter_et, 'Radius', inter_ob.scale[0])
-        write_val(inter_et, 'TrafficBehaviour', inter_ob.inter_road_beh)
+def roads_improperly_connected(road_cols, margin=1.5):
+    return format_connection_report(road_connection_report(road_cols, margin))
 
+
+@traced
+def snapshot_roads(road_cols, inter_objs):
+    """returns (intersections, roads) as plain data for utils_road_encoder, so encoding doesn't touch bpy"""
+    inters = [(x.name, tuple(x.location), x.scale[0], x.inter_road_beh) for x in inter_objs]
+    roads = []
     for node_col in road_cols:
-        locs = []
-        for road_ob in node_col.objects:
-            rs_edit_upd(road_ob)
-            dat_seg = write_chunk(root, RDS)
+        props = node_col.road_node_prop
+        shapes = []
+        # segments are written in chain order when the road shapes form one
+        for road_ob in rs_order(node_col.objects) or list(node_col.objects):
+            # read only: corners relative to the first one don't depend on shape origin or support verts
             points = rs_evaluate_verts(road_ob)
-            points = [points[0], *[x - points[0] for x in points[1:]]]
-            write_val(dat_seg, 'Name', road_ob.name)
-            write_val(dat_seg, 'Lanes', node_col.road_node_prop.lanes)
-            write_xyz(dat_seg, 'Position', *points[1])
-            write_xyz(dat_seg, 'Position2', *points[2])
-            write_xyz(dat_seg, 'Position3', *points[3])
-            locs.append(points[0])
-
-        node_et = write_chunk(root, ROA)
-        write_val(node_et, 'Name', node_col.name)
-        write_val(node_et, 'StartIntersectionLocatorNode', node_col.road_node_prop.inter_start.name)
-        write_val(node_et, 'EndIntersectionLocatorNode', node_col.road_node_prop.inter_end.name)
-        write_val(node_et, 'MaximumCars', node_col.road_node_prop.max_cars)
-        write_val(node_et, 'NoReset', int(node_col.road_node_prop.short))
-        write_val(node_et, 'Unknown2', node_col.road_node_prop.speed)
-        write_val(node_et, 'Unknown3', node_col.road_node_prop.intel)
-        write_val(node_et, 'Unknown4', node_col.road_node_prop.unknown)
-        for i, road_ob in enumerate(node_col.objects):
-            seg_et = write_chunk(node_et, RSG)
-            write_val(seg_et, 'Name', road_ob.name)
-            write_val(seg_et, 'CubeShape', road_ob.name)
-            write_mat_xyz(seg_et, 'Transform', *locs[i])
-            write_mat_xyz(seg_et, 'Unknown')
-
-    write_ET(root, filepath)
+            shapes.append((road_ob.name, tuple(points[0]), *[tuple(x - points[0]) for x in points[1:]]))
+        roads.append({
+            'name': node_col.name,
+            'start_inter': props.inter_start.name,
+            'end_inter': props.inter_end.name,
+            'max_cars': props.max_cars,
+            'noreset': int(props.short),
+            'speed': props.speed,
+            'intel': props.intel,
+            'unknown': props.unknown,
+            'lanes': props.lanes,
+            'shapes': shapes,
+        })
+    return inters, roads
+
+
+# below this many road shapes starting worker processes costs more than it saves
+PARALLEL_EXPORT_MIN_SHAPES = 5000
+
+
+def encode_roads(roads, workers=1):
+    """yields p3dxml fragments of roads in order, each as soon as it's encoded.
+    Encoded by a process pool of workers (None - CPU count) if there's more than one and enough road shapes.
+    Worker processes are started with sys.executable, which isn't always a Python interpreter inside Blender,
+    so the add-on only does that if ParallelRoadExport preference is on"""
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    if workers > 1 and sum(len(x['shapes']) for x in roads) >= PARALLEL_EXPORT_MIN_SHAPES:
+        try:
+            for count, fragment in utils_road_encoder.encode_roads_parallel(roads, workers):
+                yield fragment
+                done += count
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Parallel road encoding failed ({e}), encoding the rest in this process")
+    for road in roads[done:]:
+        yield utils_road_encoder.encode_road(road)
+
+
+@traced
+def export_roads_and_intersects(filepath, road_cols, inter_objs, workers=1):
+    inters, roads = snapshot_roads(road_cols, inter_objs)
+    with p3d_writer(filepath) as w:
+        if is_p3d(filepath):
+            # binary chunks are built straight from the snapshot instead of parsing p3dxml fragments back
+            utils_road_encoder.write_intersections(w, inters)
+            for road in roads:
+                utils_road_encoder.write_road(w, road)
+        else:
+            w.write_raw(utils_road_encoder.encode_intersections(inters))
+            for fragment in encode_roads(roads, workers):
+                w.write_raw(fragment)
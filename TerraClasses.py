@@ -0,0 +1,70 @@
+import bpy
+from bpy_extras.io_utils import ImportHelper
+from . import TerraManager
+from .utils_profile import profiled
+
+
+class FileImportTerra(bpy.types.Operator, ImportHelper):
+    """Import roads, paths, fences, locators and instance lists from a single file in one pass"""
+    bl_idname = 'import_scene.terra_p3dxml'
+    bl_label = 'Import Everything...'
+    filename_ext = '.p3dxml'
+    filter_glob: bpy.props.StringProperty(
+        default='*.p3dxml;*.p3d',
+        options={'HIDDEN'},
+        maxlen=255,
+        )
+    modules: bpy.props.EnumProperty(
+        items=TerraManager.terra_modules,
+        name='Modules',
+        description='Which map data to import',
+        options={'ENUM_FLAG'},
+        default={x[0] for x in TerraManager.terra_modules},
+        )
+    try_sort: bpy.props.BoolProperty(
+        name='Try to sort roads',
+        description='Attempt to sort imported road nodes based on first 2 characters in the name',
+        default=True,
+        )
+
+    @profiled
+    def execute(self, context):
+        if not self.modules:
+            self.report({'ERROR_INVALID_INPUT'}, 'No modules selected!')
+            return {'CANCELLED'}
+        stats = TerraManager.import_terra(self.filepath, context, self.modules, self.try_sort)
+        module_names = {x[0]: x[1] for x in TerraManager.terra_modules}
+        module_names['PARSE'] = 'Parsing'
+        for module, (count, seconds) in stats.items():
+            print(f"{module_names[module]}: {count} chunks in {seconds:.3f} secs")
+        self.report({'INFO'}, f"Imported {stats['PARSE'][0]} chunks in {sum(x[1] for x in stats.values()):.3f} secs")
+        return {'FINISHED'}
+
+
+class MiscModule:
+    @classmethod
+    def poll(cls, context):
+        return context.preferences.addons[__package__].preferences.MiscEnabled
+
+
+class MDE_PT_TerraFileManagement(bpy.types.Panel, MiscModule):
+    bl_label = 'Terra'
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'WMDE Misc'
+    bl_order = 5
+
+    def draw_header(self, context):
+        layout = self.layout
+        row = layout.row()
+        row.label(text='', icon='FILE')
+
+    def draw(self, context):
+        layout = self.layout
+        layout.operator(FileImportTerra.bl_idname, icon='IMPORT')
+
+
+to_register = [
+    FileImportTerra,
+    MDE_PT_TerraFileManagement,
+]
@@ -0,0 +1,63 @@
+from time import time
+import bpy
+from .utils_p3dxml import *
+from . import RoadManager, PathManager, FenceManager, LocatorManager, InstanceManager
+
+terra_modules = [
+    ('ROADS', 'Roads', 'Intersections, road nodes and road shapes'),
+    ('PATHS', 'Paths', 'Pedestrian paths'),
+    ('FENCES', 'Fences', 'Fences'),
+    ('LOCATORS', 'Locators', 'Locators with their volumes, matrices, splines and cameras'),
+    ('INSTANCES', 'Instance Lists', 'Instance lists (as empties)'),
+]
+# Chunk types handled by each module
+terra_module_chunks = {
+    'ROADS': (INS, RDS, ROA),
+    'PATHS': (PAT,),
+    'FENCES': (FEN,),
+    'LOCATORS': (LOC,),
+    'INSTANCES': (INL,),
+}
+
+
+@traced
+@phase('build')
+def import_terra(filepath, context, modules, try_sort=True):
+    """imports chunks of every module in modules in a single pass over filepath.
+    returns {module: [chunk count, seconds]}, parsing time is under 'PARSE'"""
+    stats = {module: [0, 0.0] for module in modules}
+    chunk_modules = {chunk_type: module for module in modules for chunk_type in terra_module_chunks[module]}
+    if 'ROADS' in modules:
+        intersections_collection = RoadManager.GetIntersectionsCollection(context)
+        all_roads_collection = RoadManager.GetRoadsCollection(context)
+    if 'PATHS' in modules:
+        paths_collection = PathManager.get_paths_collection()
+    road_shapes = {}
+    roads = []
+    time_start = time()
+    for chunk in terra_iter(filepath, tuple(chunk_modules), use_index=False):
+        chunk_type = chunk.get('Type')
+        module = chunk_modules[chunk_type]
+        chunk_start = time()
+        if chunk_type == INS:
+            RoadManager.import_intersect(chunk, intersections_collection)
+        elif chunk_type == RDS:
+            road_shapes[find_val(chunk, 'Name')] = RoadManager.read_road_shape(chunk)
+        elif chunk_type == ROA:
+            roads.append(RoadManager.read_road(chunk))
+        elif chunk_type == PAT:
+            PathManager.path_import(chunk, paths_collection)
+        elif chunk_type == FEN:
+            FenceManager.fence_import(chunk)
+        elif chunk_type == LOC:
+            LocatorManager.locator_import(chunk)
+        elif chunk_type == INL:
+            InstanceManager.import_instance_list(chunk, context)
+        stats[module][0] += 1
+        stats[module][1] += time() - chunk_start
+    if 'ROADS' in modules:
+        build_start = time()
+        RoadManager.build_roads(roads, road_shapes, try_sort, all_roads_collection)
+        stats['ROADS'][1] += time() - build_start
+    stats['PARSE'] = [sum(x[0] for x in stats.values()), time() - time_start - sum(x[1] for x in stats.values())]
+    return stats
@@ -2,10 +2,12 @@ from email.policy import default
 import bpy
 from time import time
 from bpy.props import *
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import ImportHelper
 from . import TreeManager as TM
 from os import path
 from .utils_p3dxml import *
+from .utils_profile import profiled
+from .utils_bpy import P3DExportHelper
 
 def GetMarkersCollection(context):
     if "IntersectMarkers" not in context.scene.collection.children:
@@ -20,22 +22,12 @@ class LoadIntersectPoints(bpy.types.Operator, ImportHelper):
     bl_idname = 'import_scene.intersect_points'
     bl_label = "Load Intersect Markers"
     filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(default='*.p3dxml',
+    filter_glob: bpy.props.StringProperty(default='*.p3dxml;*.p3d',
                                           options={'HIDDEN'},
                                           maxlen=255)
+    @profiled
     def execute(self, context):
-        marker_col = GetMarkersCollection(context)
-        root = terra_read(self.filepath)
-        for i in find_chunks(root, "0x3F00003"):
-            bbox = find_chunks(i, "0x10003")[0]
-            if find_xyz(bbox, "Low").xy not in [j.location.xy for j in marker_col.objects]:
-                a = bpy.data.objects.new("iMarker", None)
-                a.location = find_xyz(bbox, "Low")
-                marker_col.objects.link(a)
-            if find_xyz(bbox, "High").xy not in [j.location.xy for j in marker_col.objects]:
-                b = bpy.data.objects.new("iMarker", None)
-                b.location = find_xyz(bbox, "High")
-                marker_col.objects.link(b)
+        TM.import_intersect_markers(self.filepath, GetMarkersCollection(context))
         return {'FINISHED'}                                    
 
 
@@ -51,6 +43,7 @@ class CreateMarkersFromMeshOperator(bpy.types.Operator):
         return context.selected_objects and 'MESH' in [x.type for x in context.selected_objects]
          
 
+    @profiled
     def execute(self, context):
         marker_col = GetMarkersCollection(context)
         
@@ -88,6 +81,7 @@ class CreateMarkersGridFromMeshOperator(bpy.types.Operator):
         default = False,
     )
 
+    @profiled
     def execute(self, context):
         marker_col = GetMarkersCollection(context)
         mesh_objs = [x for x in context.selected_objects if x.type == 'MESH']
@@ -111,37 +105,33 @@ class ResetMarkers(bpy.types.Operator):
     bl_label = "Reset Intersect Markers"
     bl_options = {'REGISTER'}
 
+    @profiled
     def execute(self, context):
         markers_col = GetMarkersCollection(context)
         for obj in markers_col.objects:
             bpy.data.objects.remove(obj)
         return {'FINISHED'}
 
-class GridTreeExport(bpy.types.Operator, ExportHelper):
+class GridTreeExport(bpy.types.Operator, P3DExportHelper):
     """Generate Tree based on Intersect Markers"""
     bl_idname = "export_scene.grid_tree"
     bl_label = "Generate Grid Tree"
     bl_description = "Generate Grid Tree"
 
-    filename_ext = '.p3dxml'
-    filter_glob: bpy.props.StringProperty(default='*.p3dxml',
-                                          options={'HIDDEN'},
-                                          maxlen=255)
-
     grid_size: bpy.props.FloatProperty(
         name = "Grid Cell Size",
         description = "Don't change unless you know what you're doing!",
         default = 20,
     )
 
+    @profiled
     def execute(self, context):
         if "IntersectMarkers" not in context.scene.collection.children or not context.scene.collection.children["IntersectMarkers"].objects:
             self.report({'ERROR'}, "No Intersect Markers found!")
             return {"CANCELLED"}
         t_start = time()
         t = TM.grid_generate(marker_set = [x.location for x in context.scene.collection.children["IntersectMarkers"].objects], gridsize = self.grid_size)
-        TM.export_tree(t, self.filepath)
-        a = t.root.children_count()
+        a = TM.export_tree(t, self.filepath)
         b = time() - t_start
         self.report({'INFO'}, f"Finished exporting {a} Node Tree in {b:.3f} secs")
         print(f"Finished exporting {a} Node Tree in {b:.3f} secs")
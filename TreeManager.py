@@ -36,53 +36,85 @@ def snap_vector_to_divisible(x : Vector, a, up = True):
     return x
 
 class TreeNode:
-    def __init__(self, parent = None, lc = None, rc = None, split_axis = None, split_pos = None, corner_bl = None, corner_ur = None):
-        self.parent = parent
-        self.lc = lc
-        self.rc = rc
-        self.split_axis = split_axis
-        self.split_pos = split_pos
-        self.corner_bl = corner_bl
-        self.corner_ur = corner_ur
-        # limit_SE    = 0
-        # limit_SPE   = 0
-        # limit_IE    = 0
-        # limit_DPE   = 0
-        # limit_FE    = 0
-        # limit_RSE   = 0
-        # limit_PSE   = 0
-        # limit_AE    = 0
+    """View of one node of a Tree, reads and writes the tree's arrays"""
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, TreeNode) and other.tree is self.tree and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def node(self, index):
+        """returns view of node at index of the same tree, None if index is -1"""
+        return TreeNode(self.tree, index) if index >= 0 else None
+
+    @property
+    def parent(self):
+        return self.node(int(self.tree.parents[self.index]))
+
+    @property
+    def lc(self):
+        return self.node(int(self.tree.children[self.index, 0]))
+
+    @property
+    def rc(self):
+        return self.node(int(self.tree.children[self.index, 1]))
+
+    @property
+    def split_axis(self):
+        axis = int(self.tree.split_axes[self.index])
+        return axis if axis >= 0 else None
+
+    @property
+    def split_pos(self):
+        return float(self.tree.split_positions[self.index]) if self.tree.split_axes[self.index] >= 0 else None
+
+    @property
+    def corner_bl(self):
+        return Vector(self.tree.bounds[self.index, 0].tolist())
+
+    @corner_bl.setter
+    def corner_bl(self, value):
+        self.tree.bounds[self.index, 0] = tuple(value)
+
+    @property
+    def corner_ur(self):
+        return Vector(self.tree.bounds[self.index, 1].tolist())
+
+    @corner_ur.setter
+    def corner_ur(self, value):
+        self.tree.bounds[self.index, 1] = tuple(value)
 
     def split(self, axis, pos):
-        self.lc = TreeNode(parent=self, corner_bl=self.corner_bl, corner_ur=self.corner_ur)
-        self.rc = TreeNode(parent=self, corner_bl=self.corner_bl, corner_ur=self.corner_ur)
-        self.split_axis = axis
-        self.split_pos = pos
-        if axis == 0:
-            self.lc.corner_ur = Vector((pos,self.corner_ur.y,self.corner_ur.z))
-            self.rc.corner_bl = Vector((pos,self.corner_bl.y,self.corner_bl.z))
-        if axis == 1:
-            self.lc.corner_ur = Vector((self.corner_ur.x,pos,self.corner_ur.z))
-            self.rc.corner_bl = Vector((self.corner_bl.x,pos,self.corner_bl.z))
-        return self.lc,self.rc
+        tree = self.tree
+        bl, ur = tree.bounds[self.index]
+        lc = tree.add_node(self.index, bl, ur)
+        rc = tree.add_node(self.index, bl, ur)
+        tree.children[self.index] = lc.index, rc.index
+        tree.split_axes[self.index] = axis
+        tree.split_positions[self.index] = pos
+        tree.bounds[lc.index, 1, axis] = pos
+        tree.bounds[rc.index, 0, axis] = pos
+        return lc,rc
 
     def children_count(self):
-        x = 1
-        if self.lc:
-            x += self.lc.children_count()
-        if self.rc:
-            x += self.rc.children_count()
-        return x
-    
+        return self.preorder_layout()[2][0]
+
     def contains_vector(a : Vector):
         pass
 
     def dim(self):
-        return (self.corner_ur-self.corner_bl).x,(self.corner_ur-self.corner_bl).y,(self.corner_ur-self.corner_bl).z
+        # float32 like the corners themselves
+        return tuple((self.tree.bounds[self.index, 1] - self.tree.bounds[self.index, 0]).tolist())
 
     # debug stuff
     def __str__(self):
-        return f"TreeNode \t#{id(self)} parent = {id(self.parent) if self.parent else '       ROOT'}\tlc = {id(self.lc) if self.lc else None}, rc = {id(self.rc) if self.rc else None}\t split_axis = {self.split_axis}, split_pos = {self.split_pos}. \t children count = {self.children_count()}\t bounds = ({self.corner_bl},{self.corner_ur})"
+        return f"TreeNode \t#{self.index} parent = {self.parent.index if self.parent else '       ROOT'}\tlc = {self.lc.index if self.lc else None}, rc = {self.rc.index if self.rc else None}\t split_axis = {self.split_axis}, split_pos = {self.split_pos}. \t children count = {self.children_count()}\t bounds = ({self.corner_bl},{self.corner_ur})"
 
     def str_inorder(self):
         if not(self.lc or self.rc):
@@ -99,20 +131,77 @@ class TreeNode:
         if self.rc: self.rc.print_inorder()
     
     def list_preorder(self):
-        output = [self]
-        if self.lc: output += self.lc.list_preorder()
-        if self.rc: output += self.rc.list_preorder()
-        return output
+        return self.preorder_layout()[0]
+
+    def preorder_layout(self):
+        """returns (nodes, parents, sizes) of this subtree in a single traversal: nodes in preorder,
+        index of each node's parent in nodes (-1 for self) and number of nodes in each node's subtree (itself included)"""
+        order, parents, sizes = self.tree.preorder(self.index)
+        return [TreeNode(self.tree, i) for i in order.tolist()], parents.tolist(), sizes.tolist()
 
 class Tree:
+    """k-d tree as a structure of arrays, one row per node in creation order (root is row 0).
+    Bounds are float32 like the mathutils Vectors they come from"""
 
-    root = TreeNode()
-    def __init__(self, min : Vector = Vector(), max  : Vector = Vector()):
+    def __init__(self, min : Vector = Vector(), max  : Vector = Vector(), capacity = 64):
         self.min = min
         self.max = max
-        self.root.corner_bl = min
-        self.root.corner_ur = max
-    
+        self.count = 0
+        self.parents = np.full(capacity, -1, dtype=np.int32)
+        self.children = np.full((capacity, 2), -1, dtype=np.int32)
+        self.split_axes = np.full(capacity, -1, dtype=np.int8)
+        self.split_positions = np.zeros(capacity, dtype=np.float64)
+        self.bounds = np.zeros((capacity, 2, 3), dtype=np.float32)
+        # limit_SE    = 0
+        # limit_SPE   = 0
+        # limit_IE    = 0
+        # limit_DPE   = 0
+        # limit_FE    = 0
+        # limit_RSE   = 0
+        # limit_PSE   = 0
+        # limit_AE    = 0
+        self.root = self.add_node(-1, min, max)
+
+    def add_node(self, parent, corner_bl, corner_ur):
+        """returns view of a new leaf node"""
+        if self.count == len(self.parents):
+            self.grow(2 * self.count)
+        index = self.count
+        self.count += 1
+        self.parents[index] = parent
+        self.bounds[index] = tuple(corner_bl), tuple(corner_ur)
+        return TreeNode(self, index)
+
+    def grow(self, capacity):
+        for name in ['parents', 'children', 'split_axes', 'split_positions', 'bounds']:
+            old = getattr(self, name)
+            new = np.full((capacity, *old.shape[1:]), -1 if old.dtype.kind == 'i' else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def preorder(self, start = 0):
+        """returns (order, parents, sizes) arrays of subtree at start: node indices in preorder,
+        position of each node's parent in order (-1 for start) and size of each node's subtree.
+        Only nodes of the subtree are visited"""
+        child = self.children.item
+        order = []
+        parents = []
+        stack = [(start, -1)]
+        while stack:
+            i, parent = stack.pop()
+            position = len(order)
+            order.append(i)
+            parents.append(parent)
+            rc = child(i, 1)
+            if rc >= 0: stack.append((rc, position))
+            lc = child(i, 0)
+            if lc >= 0: stack.append((lc, position))
+        # parents come before their children, so subtree sizes add up from the back
+        sizes = [1] * len(order)
+        for k in range(len(order) - 1, 0, -1):
+            sizes[parents[k]] += sizes[k]
+        return np.array(order, dtype=np.int64), np.array(parents, dtype=np.int64), np.array(sizes, dtype=np.int64)
+
     def __str__(self):
         return self.root.str_inorder()
 
@@ -122,12 +211,16 @@ def grid_generate(gridsize = 20, marker_set = []):
     treemin = snap_vector_to_divisible(treemin, gridsize, up = False)
     treemax = snap_vector_to_divisible(treemax, gridsize, up = True)
 
+    def any_in_bounds(treenode : TreeNode, markers):
+        corner_bl, corner_ur = treenode.corner_bl, treenode.corner_ur
+        return any(point_in_bound(x, corner_bl, corner_ur, ignore_z=True) for x in markers)
+
     def QuadTree(treenode : TreeNode, marker_set):
         if not treenode:
             return
         if (treenode.dim()[0] <= gridsize) and (treenode.dim()[1] <= gridsize):
             return
-        if not (any([point_in_bound(x, treenode.corner_bl, treenode.corner_ur, ignore_z=True) for x in marker_set])):
+        if not any_in_bounds(treenode, marker_set):
             return
         
         #Chopping rectangles with 1 side ~= gridsize
@@ -143,9 +236,10 @@ def grid_generate(gridsize = 20, marker_set = []):
         
         #Actual QuadTree magic
         a,b = treenode.split(0, snap_int_to_divisible(treenode.corner_bl[0] + (treenode.dim()[0]/2.),gridsize, False))
-        marker_set_a = [m for m in marker_set if m.x<=treenode.split_pos]    
-        marker_set_b = [m for m in marker_set if m.x>treenode.split_pos]    
-        if a.dim()[1] > gridsize and any([point_in_bound(x, a.corner_bl, a.corner_ur, ignore_z=True) for x in marker_set_a]):
+        split_pos = treenode.split_pos
+        marker_set_a = [m for m in marker_set if m.x<=split_pos]
+        marker_set_b = [m for m in marker_set if m.x>split_pos]
+        if a.dim()[1] > gridsize and any_in_bounds(a, marker_set_a):
 
             new_split_pos = snap_int_to_divisible(a.corner_bl[1] + (a.dim()[1]/2.), gridsize, False)
             aa,ab = a.split(1, new_split_pos)
@@ -156,7 +250,7 @@ def grid_generate(gridsize = 20, marker_set = []):
         else:
             QuadTree(a, marker_set_a)
 
-        if b.dim()[1] > gridsize and any([point_in_bound(x, b.corner_bl, b.corner_ur, ignore_z=True) for x in marker_set_b]):
+        if b.dim()[1] > gridsize and any_in_bounds(b, marker_set_b):
             
             new_split_pos = snap_int_to_divisible(b.corner_bl[1] + (b.dim()[1]/2.), gridsize, False)
             ba,bb = b.split(1, new_split_pos)
@@ -172,46 +266,58 @@ def grid_generate(gridsize = 20, marker_set = []):
     QuadTree(T.root, marker_set)
     return T
 
+@traced
+@phase('build')
+def import_intersect_markers(filepath, marker_col):
+    """creates markers at bounding box corners of Intersect (0x3F00003) chunks in filepath, skipping already marked spots"""
+    root = terra_read(filepath)
+    for i in find_chunks(root, "0x3F00003"):
+        bbox = find_chunks(i, "0x10003")[0]
+        if find_xyz(bbox, "Low").xy not in [j.location.xy for j in marker_col.objects]:
+            a = bpy.data.objects.new("iMarker", None)
+            a.location = find_xyz(bbox, "Low")
+            with phase('link'):
+                marker_col.objects.link(a)
+        if find_xyz(bbox, "High").xy not in [j.location.xy for j in marker_col.objects]:
+            b = bpy.data.objects.new("iMarker", None)
+            b.location = find_xyz(bbox, "High")
+            with phase('link'):
+                marker_col.objects.link(b)
+
 def import_tree(filepath):
     t = Tree()
     return t
 
+@traced
 def export_tree(Tree : Tree, filepath):
-    root = p3d_et()
-    tree_chunk = write_chunk(root, "0x3F00004")
-    write_xyz(tree_chunk, "WorldBoundsMinimum", *Tree.min)
-    write_xyz(tree_chunk, "WorldBoundsMaximum", *Tree.max)
-    tree_list = Tree.root.list_preorder()
-    for i,node in enumerate(tree_list):
-        TN = write_chunk(tree_chunk, "0x3F00005")
-        write_val(TN, "ChildCount", node.children_count() - 1)
-        if node.parent:
-            write_val(TN, "ParentOffset", tree_list.index(node.parent) - i)
-        else:
-            write_val(TN, "ParentOffset", 0)
-        TN2 = write_chunk(TN, "0x3F00006")
-        if node.split_axis is None:
-            write_val(TN2, "Axis", -1)
-            write_val(TN2, "Position", -1)
-        else:
-            #axis swap
-            if node.split_axis == 0:
-                write_val(TN2, "Axis", 0)
-            if node.split_axis == 1:
-                write_val(TN2, "Axis", 2)
-            if node.split_axis == 2:
-                write_val(TN2, "Axis", 1)
-            write_val(TN2, "Position", node.split_pos)
-        # write_val(TN2, "StaticWorldMeshLimit", 0)
-        # write_val(TN2, "StaticWorldPropLimit", 0)
-        # write_val(TN2, "GroundCollisionLimit", 0)
-        # write_val(TN2, "CharactersCarsAndBreakableWorldPropLimit", 0)
-        # write_val(TN2, "WallCollisionLimit", 0)
-        # write_val(TN2, "RoadNodeSegmentLimit", 0)
-        # write_val(TN2, "PedNodeSegmentLimit", 0)
-        # write_val(TN2, "WorldMeshLimit", 0)
-
-    write_ET(root, filepath)
+    """returns number of exported nodes"""
+    order, parents, sizes = Tree.preorder()
+    count = len(order)
+    child_counts = (sizes - 1).tolist()
+    # root's parent offset is 0
+    parent_offsets = np.where(parents >= 0, parents - np.arange(count), 0).tolist()
+    #axis swap
+    axes = np.array([0, 2, 1, -1])[Tree.split_axes[order]].tolist()
+    positions = Tree.split_positions[order].tolist()
+    with p3d_writer(filepath) as w, w.chunk("0x3F00004"):
+        w.xyz("WorldBoundsMinimum", *Tree.min)
+        w.xyz("WorldBoundsMaximum", *Tree.max)
+        for i in range(count):
+            with w.chunk("0x3F00005"):
+                w.val("ChildCount", child_counts[i])
+                w.val("ParentOffset", parent_offsets[i])
+                with w.chunk("0x3F00006"):
+                    w.val("Axis", axes[i])
+                    w.val("Position", positions[i] if axes[i] >= 0 else -1)
+                    # w.val("StaticWorldMeshLimit", 0)
+                    # w.val("StaticWorldPropLimit", 0)
+                    # w.val("GroundCollisionLimit", 0)
+                    # w.val("CharactersCarsAndBreakableWorldPropLimit", 0)
+                    # w.val("WallCollisionLimit", 0)
+                    # w.val("RoadNodeSegmentLimit", 0)
+                    # w.val("PedNodeSegmentLimit", 0)
+                    # w.val("WorldMeshLimit", 0)
+    return count
 
 def add_salt(x : Vector, salt_amount = 3):
     """returns 4 vectors with salt_amount added in 4 XY directions"""
@@ -7,6 +7,8 @@ from . import FenceClasses
 from . import LocatorClasses
 from . import TreeClasses
 from . import InstanceClasses
+from . import TerraClasses
+from . import PerformanceClasses
 
 
 bl_info = {'name': "WMDE - Weasel's Map Data Editor",
@@ -42,6 +44,11 @@ class WMDE_Preferences(bpy.types.AddonPreferences):
         name='Enable Misc Module', 
         default=True
     )
+    ParallelRoadExport: bpy.props.BoolProperty(
+        name='Parallel Road Export',
+        description="Encode big road exports in worker processes. Needs Blender's sys.executable to be its bundled Python",
+        default=False
+    )
     
 
     def draw(self, context):
@@ -52,9 +59,10 @@ class WMDE_Preferences(bpy.types.AddonPreferences):
         col.prop(self, 'FencesEnabled')
         col.prop(self, 'LocatorsEnabled')
         col.prop(self, 'MiscEnabled')
+        col.prop(self, 'ParallelRoadExport')
 
 classes = [WMDE_Preferences]
-subclasses = [RoadClasses, PathClasses, FenceClasses, LocatorClasses, TreeClasses, InstanceClasses]
+subclasses = [RoadClasses, PathClasses, FenceClasses, LocatorClasses, TreeClasses, InstanceClasses, TerraClasses, PerformanceClasses]
 
 # class WOASdebugOperator(bpy.types.Operator):
 #     bl_idname = "object.woasdebug"
@@ -90,6 +98,13 @@ def register():
         min=0,
         max=4
         )
+    bpy.types.Object.inter_radius = bpy.props.FloatProperty(
+        name='Radius',
+        description='Radius of the intersection, stored as its uniform scale',
+        min=0,
+        get=get_inter_radius,
+        set=set_inter_radius,
+        )
     bpy.types.Object.locator_prop = bpy.props.PointerProperty(
         type=(LocatorClasses.LocatorPropGroup),
         name='WMDE Locator Properties'
@@ -100,8 +115,15 @@ def register():
         set=set_intersection_names_visible,
         get=get_intersection_names_visible,
         )
+    bpy.types.WindowManager.wmde_profile = bpy.props.PointerProperty(
+        type=PerformanceClasses.ProfilePropGroup,
+        name='WMDE Profiling Settings'
+    )
+
+    for handlers, handler in road_handlers:
+        handlers.append(handler)
 
-from .RoadManager import GetIntersectionsCollection
+from .RoadManager import GetIntersectionsCollection, get_inter_radius, set_inter_radius, road_handlers
 def set_intersection_names_visible(self, value):
     self["intersection_names_visible"] = value
     for int_obj in GetIntersectionsCollection(bpy.context).objects:
@@ -118,8 +140,13 @@ def unregister():
         unregister_class(cls)
     del bpy.types.Collection.road_node_prop
     del bpy.types.Object.inter_road_beh
+    del bpy.types.Object.inter_radius
     del bpy.types.Object.locator_prop
     del bpy.types.WindowManager.intersection_names_visible
+    del bpy.types.WindowManager.wmde_profile
+    for handlers, handler in road_handlers:
+        if handler in handlers:
+            handlers.remove(handler)
 
 
 if __name__ == '__main__':
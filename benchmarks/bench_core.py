@@ -0,0 +1,125 @@
+"""Benchmarks of the bpy-free core (utils_p3dxml, utils_p3d, utils_math), runs with plain Python + numpy:
+
+    python benchmarks/bench_core.py --scale 4 --report core.json --baseline old_core.json
+
+mathutils is replaced by utils_mathutils when it isn't installed.
+Prints a JSON report with min/median seconds per case, see cli.py --bench for the Blender side.
+`python -m pytest tests` runs every case once (tests/test_benchmarks.py)"""
+import argparse
+import importlib
+import importlib.machinery
+import importlib.util
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+from time import perf_counter
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE = 'wmde_core'
+
+
+def load_core():
+    """returns the add-on directory as a package without running its __init__ (which needs bpy)"""
+    if CORE not in sys.modules:
+        package = importlib.util.module_from_spec(importlib.machinery.ModuleSpec(CORE, None, is_package=True))
+        package.__path__ = [ADDON_DIR]
+        sys.modules[CORE] = package
+    for name in ['utils_p3dxml', 'utils_p3d', 'utils_math', 'utils_synthetic']:
+        importlib.import_module(f"{CORE}.{name}")
+    return sys.modules[CORE]
+
+
+def measure(func, repeat):
+    """returns (min, median) seconds of repeat calls of func"""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+class Placeholder:
+    """object with a location, what build_arc takes as origin"""
+
+    def __init__(self, location):
+        self.location = location
+
+
+def cases(core, work_dir, scale):
+    """returns [(name, func), ...] to benchmark"""
+    px, p3d, um = core.utils_p3dxml, core.utils_p3d, core.utils_math
+    xml_path = os.path.join(work_dir, 'synthetic.p3dxml')
+    bin_path = os.path.join(work_dir, 'synthetic.p3d')
+    sizes = dict(intersections=100 * scale, roads=100 * scale, locators=10 * scale, paths=100 * scale, fences=100 * scale)
+    core.utils_synthetic.write_synthetic_map(xml_path, **sizes)
+    core.utils_synthetic.write_synthetic_map(bin_path, **sizes)
+    root = px.terra_read(xml_path)
+    locators = px.find_chunks(root, px.LOC)
+    paths = px.find_chunks(root, px.PAT)
+    rail_cams = [px.find_val(x, 'Data') for x in root.iter('Chunk') if x.get('Type') == '0x300000A']
+    graph = {i: {(i + 1) % (100 * scale), (i - 1) % (100 * scale)} for i in range(100 * scale)}
+    Vector, Euler = um.Vector, um.Euler
+
+    return [
+        ('generate_p3dxml', lambda: core.utils_synthetic.write_synthetic_map(os.path.join(work_dir, 'gen.p3dxml'), **sizes)),
+        ('terra_read_p3dxml', lambda: px.terra_read(xml_path)),
+        ('terra_read_p3d', lambda: px.terra_read(bin_path)),
+        ('terra_iter_roads', lambda: sum(1 for _ in px.terra_iter(xml_path, [px.RDS, px.ROA]))),
+        ('write_ET_p3dxml', lambda: px.write_ET(root, os.path.join(work_dir, 'out.p3dxml'))),
+        ('write_ET_p3d', lambda: px.write_ET(root, os.path.join(work_dir, 'out.p3d'))),
+        ('find_chunks', lambda: [px.find_chunks(root, x) for x in [px.INS, px.RDS, px.ROA, px.PAT, px.FEN, px.LOC]]),
+        ('find_positions', lambda: [px.find_positions(x) for x in paths]),
+        ('find_volumes', lambda: [px.find_volumes(x) for x in locators]),
+        ('find_locrot_LOM', lambda: [px.find_locrot_LOM(x) for x in locators]),
+        ('rail_cam_b64', lambda: [px.RailCamToB64(px.B64ToRailCam(x)) for x in rail_cams * 100]),
+        ('build_arc', lambda: um.build_arc(3.14, 20, 50 * scale, 5, Vector((1, 1, 1)), Vector(), Placeholder(Vector()))),
+        ('build_circle', lambda: um.build_circle(10, 50 * scale, Vector(), Vector(), Euler(), Vector((1, 1, 1)))),
+        ('create_straight', lambda: um.create_straight(Vector(), Euler((0, 0, 0.5)), 50 * scale, 10, 100)),
+        ('is_connected', lambda: um.is_connected(graph)),
+        ('connected_components', lambda: um.connected_components(graph, [(a, b) for a in graph for b in graph[a]])),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='multiplies synthetic map size')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case')
+    parser.add_argument('--filter', help='only run cases matching this regex')
+    parser.add_argument('--report', help='also write JSON report into this file')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    core = load_core()
+    results = []
+    with tempfile.TemporaryDirectory(prefix='wmde_core_bench_') as work_dir:
+        for name, func in cases(core, work_dir, args.scale):
+            if args.filter and not re.search(args.filter, name):
+                continue
+            best, median = measure(func, args.repeat)
+            results.append({'case': name, 'min': round(best, 6), 'median': round(median, 6)})
+            print(f"{name:24} min {best * 1000:10.3f} ms  median {median * 1000:10.3f} ms", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {x['case']: x for x in json.load(f)['cases']}
+        for entry in results:
+            old = baseline.get(entry['case'])
+            if old and old.get('min'):
+                entry['baseline_min'] = old['min']
+                entry['speedup'] = round(old['min'] / max(entry['min'], 1e-9), 3)
+
+    mathutils = sys.modules.get(f"{CORE}.utils_p3dxml").Vector.__module__
+    text = json.dumps({'scale': args.scale, 'repeat': args.repeat, 'python': sys.version.split()[0],
+                       'mathutils': mathutils, 'cases': results}, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
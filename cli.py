@@ -0,0 +1,253 @@
+"""Headless WMDE batch converter and benchmark, run it with Blender:
+
+    blender --background --factory-startup --python cli.py -- --input level.p3dxml --output-dir out --modules roads paths
+    blender --background --factory-startup --python cli.py -- --bench --scale 4 --report bench.json --baseline old_bench.json
+
+Convert mode imports every given module from --input and exports it into --output-dir (one file per module).
+Bench mode generates a synthetic map, then times parsing, writing and every importer/exporter on it.
+Both print a JSON report (wall time, peak RSS and object counts per phase, errors) and exit with code 1 if anything failed"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import traceback
+from time import perf_counter
+try:
+    import bpy
+except ImportError:  # run again as __mp_main__ by spawned road encoder workers (see --workers), which don't need it
+    bpy = None
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = ['roads', 'paths', 'fences', 'locators', 'tree', 'instances']
+
+
+SUBMODULES = ['TerraManager', 'RoadManager', 'PathManager', 'PathClasses', 'FenceManager', 'LocatorManager',
+              'InstanceManager', 'TreeManager', 'TreeClasses', 'utils_p3dxml', 'utils_profile', 'utils_synthetic']
+
+
+def load_addon():
+    """returns add-on package, loading and registering it unless Blender already has it enabled"""
+    init = os.path.join(ADDON_DIR, '__init__.py')
+    for module in list(sys.modules.values()):
+        if os.path.abspath(getattr(module, '__file__', None) or '') == init:
+            break
+    else:
+        name = os.path.basename(ADDON_DIR)
+        if not name.isidentifier():
+            name = 'wmde'
+        spec = importlib.util.spec_from_file_location(name, init, submodule_search_locations=[ADDON_DIR])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        module.register()
+    for submodule in SUBMODULES:
+        importlib.import_module(f"{module.__name__}.{submodule}")
+    return module
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def object_counts():
+    return {'objects': len(bpy.data.objects), 'meshes': len(bpy.data.meshes), 'curves': len(bpy.data.curves), 'collections': len(bpy.data.collections)}
+
+
+def clear_scene():
+    """removes every object, mesh, curve and collection"""
+    for data in (bpy.data.objects, bpy.data.meshes, bpy.data.curves, bpy.data.collections):
+        for block in list(data):
+            data.remove(block)
+
+
+class Report:
+    """Collects phase results, see run"""
+
+    def __init__(self):
+        self.phases = []
+
+    def run(self, phase, module, func, *args, **kwargs):
+        """runs func, records its wall time, peak RSS, object counts and error. returns func result (None if it failed)"""
+        entry = {'phase': phase, 'module': module}
+        start = perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            entry['error'] = traceback.format_exc()
+        entry['seconds'] = round(perf_counter() - start, 4)
+        entry['peak_rss_kb'] = peak_rss_kb()
+        entry.update(object_counts())
+        if isinstance(result, str) and phase == 'export':
+            entry['error'] = result
+        self.phases.append(entry)
+        return result
+
+    @property
+    def ok(self):
+        return not any('error' in x for x in self.phases)
+
+    def as_dict(self, **extra):
+        return {**extra, 'ok': self.ok, 'phases': self.phases}
+
+
+def import_modules(wmde, filepath, modules, report):
+    context = bpy.context
+    terra = [x.upper() for x in modules if x.upper() in wmde.TerraManager.terra_module_chunks]
+    if terra:
+        report.run('import', '+'.join(x.lower() for x in terra), wmde.TerraManager.import_terra, filepath, context, terra)
+    if 'tree' in modules:
+        report.run('import', 'tree', wmde.TreeManager.import_intersect_markers, filepath, wmde.TreeClasses.GetMarkersCollection(context))
+
+
+def export_roads(wmde, filepath, check=True, workers=1):
+    """returns error string if road network is invalid"""
+    RM = wmde.RoadManager
+    road_cols = [x for x in bpy.data.collections if x.road_node_prop.to_export and x.objects]
+    inter_objs = [x for x in RM.GetIntersections(bpy.context) if x.users_collection]
+    # roads were edited by this script, road_depsgraph_update didn't see it
+    RM.road_validation.invalidate()
+    if check:
+        invalid = RM.invalid_roads(road_cols, inter_objs, 1.5)
+        if invalid:
+            return invalid
+    RM.export_roads_and_intersects(filepath, road_cols, inter_objs, workers)
+
+
+def export_paths(wmde, filepath):
+    paths_collection = bpy.data.collections.get('Paths')
+    objs = [x for x in paths_collection.objects if wmde.PathClasses.object_is_path_curve(x)] if paths_collection else []
+    # the game can't handle paths of more than 32 points
+    return wmde.PathManager.export_paths(filepath, [x for x in objs if len(x.data.splines[0].points) <= 32])
+
+
+def export_fences(wmde, filepath):
+    fences_collection = bpy.data.collections.get('Fences')
+    return wmde.FenceManager.export_fences(filepath, fences_collection.all_objects if fences_collection else [])
+
+
+def export_locators(wmde, filepath):
+    locators_collection = bpy.context.scene.collection.children.get('Locators')
+    if not wmde.LocatorManager.export_locators(locators_collection.all_objects if locators_collection else [], filepath):
+        return "Some locators reported errors"
+
+
+def export_tree(wmde, filepath):
+    markers = bpy.context.scene.collection.children.get('IntersectMarkers')
+    if not markers or not markers.objects:
+        return "No Intersect Markers found"
+    wmde.TreeManager.export_tree(wmde.TreeManager.grid_generate(marker_set=[x.location for x in markers.objects], gridsize=20), filepath)
+
+
+def export_modules(wmde, output_dir, modules, ext, report, check=True, workers=1):
+    os.makedirs(output_dir, exist_ok=True)
+    exporters = {'roads': lambda fp: export_roads(wmde, fp, check, workers), 'paths': lambda fp: export_paths(wmde, fp),
+                 'fences': lambda fp: export_fences(wmde, fp), 'locators': lambda fp: export_locators(wmde, fp),
+                 'tree': lambda fp: export_tree(wmde, fp)}
+    for module in modules:
+        if module in exporters:
+            report.run('export', module, exporters[module], os.path.join(output_dir, module + ext))
+    if 'instances' in modules:
+        # one instance list per collection made by import_instance_list
+        for col in [x for x in bpy.data.collections if x.name.endswith('_instances')]:
+            listname = col.name[:-len('_instances')]
+            report.run('export', 'instances', wmde.InstanceManager.export_instance_list,
+                       os.path.join(output_dir, listname + ext), list(col.objects), listname, 'untitled drawable')
+
+
+def convert(wmde, args):
+    report = Report()
+    if args.input:
+        import_modules(wmde, args.input, args.modules, report)
+    if args.output_dir:
+        export_modules(wmde, args.output_dir, args.modules, args.ext, report, not args.no_check, args.workers)
+    return report.as_dict(mode='convert', input=args.input, output_dir=args.output_dir, modules=args.modules)
+
+
+def bench(wmde, args):
+    from time import time
+    report = Report()
+    work_dir = args.output_dir or tempfile.mkdtemp(prefix='wmde_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+    map_path = os.path.join(work_dir, 'synthetic' + args.ext)
+    sizes = {x: getattr(args, x) if getattr(args, x) is not None else default * args.scale
+             for x, default in [('intersections', 100), ('roads', 100), ('locators', 10), ('paths', 100), ('fences', 100)]}
+    counts = report.run('generate', 'all', wmde.utils_synthetic.write_synthetic_map, map_path, segments=args.segments, **sizes)
+    root = report.run('parse', 'terra_read', wmde.utils_p3dxml.terra_read, map_path)
+    if root is not None:
+        report.run('write', 'write_ET', wmde.utils_p3dxml.write_ET, root, os.path.join(work_dir, 'rewritten' + args.ext))
+        del root
+    modules = ['roads', 'paths', 'fences', 'locators']
+    clear_scene()
+    import_modules(wmde, map_path, modules, report)
+    for module in modules:
+        clear_scene()
+        import_modules(wmde, map_path, [module], report)
+        export_modules(wmde, work_dir, [module], args.ext, report, not args.no_check, args.workers)
+    result = report.as_dict(mode='bench', created=time(), map=map_path, chunks=counts, sizes=dict(sizes, segments=args.segments))
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(x['phase'], x['module']): x for x in json.load(f)['phases']}
+        for entry in result['phases']:
+            old = baseline.get((entry['phase'], entry['module']))
+            if old and old.get('seconds'):
+                entry['baseline_seconds'] = old['seconds']
+                entry['speedup'] = round(old['seconds'] / max(entry['seconds'], 1e-9), 3)
+    return result
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='blender --background --python cli.py --', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', help='p3dxml or p3d file to import')
+    parser.add_argument('--output-dir', help='directory to export every module into (bench mode: work directory)')
+    parser.add_argument('--modules', nargs='+', choices=MODULES, default=MODULES, help='modules to import/export')
+    parser.add_argument('--format', choices=['p3dxml', 'p3d'], default='p3dxml', help='exported file format')
+    parser.add_argument('--no-check', action='store_true', help="don't check road network validity before exporting")
+    parser.add_argument('--report', help='also write JSON report into this file')
+    parser.add_argument('--workers', type=int, default=1, help='processes encoding big road exports (0 - CPU count)')
+    parser.add_argument('--trace', help='record import/export spans into this Chrome trace event JSON file')
+    bench_args = parser.add_argument_group('bench mode')
+    bench_args.add_argument('--bench', action='store_true', help='benchmark on a synthetic map instead of converting')
+    bench_args.add_argument('--scale', type=int, default=1, help='multiplies default synthetic map size')
+    bench_args.add_argument('--segments', type=int, default=10, help='road shapes per road')
+    for name in ['intersections', 'roads', 'locators', 'paths', 'fences']:
+        bench_args.add_argument(f'--{name}', type=int, help=f'number of synthetic {name}' + (' of each type' if name == 'locators' else ''))
+    bench_args.add_argument('--baseline', help='JSON report of an earlier bench run to compare with')
+    args = parser.parse_args(argv)
+    args.ext = '.' + args.format
+    if not args.bench and not (args.input or args.output_dir):
+        parser.error('--input and/or --output-dir are required unless --bench is used')
+    return args
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    args = parse_args(argv)
+    wmde = None
+    try:
+        wmde = load_addon()
+        if args.trace:
+            wmde.utils_profile.start_tracing()
+        result = bench(wmde, args) if args.bench else convert(wmde, args)
+    except Exception:
+        result = {'ok': False, 'error': traceback.format_exc()}
+    if args.trace and wmde:
+        wmde.utils_profile.stop_tracing()
+        wmde.utils_profile.save_trace(args.trace)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(text)
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Tests of the bpy-free core (utils_p3dxml, utils_p3d, utils_math, ...), run with plain Python + numpy:
+
+    python -m pytest tests
+
+The add-on directory is loaded as a package without its __init__ the same way benchmarks/bench_core.py does"""
+import os
+import sys
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ADDON_DIR, 'benchmarks'))
+import bench_core
+
+
+@pytest.fixture(scope='session')
+def core():
+    return bench_core.load_core()
+
+
+@pytest.fixture(scope='session')
+def px(core):
+    return core.utils_p3dxml
+
+
+@pytest.fixture(scope='session')
+def p3d(core):
+    return core.utils_p3d
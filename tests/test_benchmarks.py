@@ -0,0 +1,12 @@
+import json
+import bench_core
+
+
+def test_bench_core(tmp_path):
+    """runs every core benchmark case once"""
+    report = str(tmp_path / 'core.json')
+    bench_core.main(['--repeat', '1', '--report', report])
+    with open(report) as f:
+        cases = json.load(f)['cases']
+    assert [x['case'] for x in cases] == [name for name, _ in bench_core.cases(bench_core.load_core(), str(tmp_path), 1)]
+    assert all(x['min'] > 0 for x in cases)
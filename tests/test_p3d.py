@@ -0,0 +1,164 @@
+import base64
+import struct
+import pytest
+import xml.etree.ElementTree as ET
+from bench_core import load_core
+
+core = load_core()
+CHUNK_LAYOUTS = core.utils_p3d.CHUNK_LAYOUTS
+LOCATOR_DATA = core.utils_p3d.LOCATOR_DATA
+LOC = core.utils_p3dxml.LOC
+
+SCALAR_SAMPLES = {'u8': '7', 'i8': '-1', 'u32': '42', 'i32': '-5', 'f32': '0.5'}
+
+
+def sample_value(parent, name, kind, index, depth=0):
+    """adds Value of kind named name with a sample value (exact in float32) to parent"""
+    if kind == 'string':
+        # lengths around multiples of 4 to hit every padding
+        ET.SubElement(parent, 'Value', Name=name, Value='abcd'[:index % 4] + 'name')
+    elif kind in SCALAR_SAMPLES:
+        ET.SubElement(parent, 'Value', Name=name, Value=SCALAR_SAMPLES[kind])
+    elif kind == 'vec3':
+        ET.SubElement(parent, 'Value', Name=name, X=str(index + 0.5), Y='-2.0', Z='3.25')
+    elif kind == 'mat4':
+        ET.SubElement(parent, 'Value', Name=name, **{k: str(i + 0.25) for i, k in enumerate(core.utils_p3d.MAT4_KEYS)})
+    elif kind in ('vec3_list', 'items3'):
+        items = ET.SubElement(parent, 'Value', Name=name)
+        for i in range(3):
+            ET.SubElement(items, 'Item', X=str(float(i)), Y='1.5', Z=str(-i - 0.5))
+    elif kind == 'strings3':
+        items = ET.SubElement(parent, 'Value', Name=name)
+        for value in ['synthetic_object', 'joint', 'Wrench']:
+            ET.SubElement(items, 'Item', Value=value)
+    elif kind == 'b64':
+        ET.SubElement(parent, 'Value', Name=name, Value=base64.standard_b64encode(bytes(range(10))).decode('ascii'))
+    elif kind.startswith('count:') and depth == 0:
+        parent.append(sample_chunk(kind[6:], depth=1))
+
+
+def sample_chunk(chunk_type, loctype=0, depth=0):
+    """returns chunk ET of chunk_type with a sample value in every field (and a child chunk for every count field)"""
+    chunk = ET.Element('Chunk', Type=chunk_type)
+    for index, (name, kind) in enumerate(CHUNK_LAYOUTS[chunk_type]):
+        if kind == 'locator':
+            data = ET.SubElement(chunk, 'Value', Name=name)
+            for sub_index, (sub_name, sub_kind) in enumerate(LOCATOR_DATA[loctype]):
+                sample_value(data, sub_name, sub_kind, sub_index)
+        elif name == 'LocatorType':
+            ET.SubElement(chunk, 'Value', Name=name, Value=str(loctype))
+        else:
+            sample_value(chunk, name, kind, index, depth)
+    return chunk
+
+
+def assert_same_values(expected, actual):
+    """asserts every Value, Item and Chunk of expected is in actual with the same attributes,
+    numbers only have to be equal as float32"""
+    assert expected.tag == actual.tag
+    for key, value in expected.items():
+        if value != actual.get(key):
+            assert struct.pack('<f', float(value)) == struct.pack('<f', float(actual.get(key))), (expected.get('Name'), key)
+    named = {x.get('Name'): x for x in actual if x.tag == 'Value'}
+    items = [x for x in actual if x.tag == 'Item']
+    chunks = [x for x in actual if x.tag == 'Chunk']
+    expected_items = [x for x in expected if x.tag == 'Item']
+    expected_chunks = [x for x in expected if x.tag == 'Chunk']
+    assert len(items) == len(expected_items)
+    assert len(chunks) == len(expected_chunks)
+    for x, y in zip(expected_items + expected_chunks, items + chunks):
+        assert_same_values(x, y)
+    for x in expected:
+        if x.tag == 'Value':
+            assert x.get('Name') in named, x.get('Name')
+            assert_same_values(x, named[x.get('Name')])
+
+
+CASES = [(x, 0) for x in CHUNK_LAYOUTS if x != LOC] + [(LOC, x) for x in LOCATOR_DATA]
+
+
+@pytest.mark.parametrize('chunk_type, loctype', CASES, ids=[f"{x}-{y}" if x == LOC else x for x, y in CASES])
+def test_chunk_round_trip(p3d, chunk_type, loctype):
+    source = sample_chunk(chunk_type, loctype)
+    data = p3d.encode_chunk(source)
+    decoded, end = p3d.decode_chunk(data)
+    assert end == len(data)
+    assert_same_values(source, decoded)
+    assert p3d.encode_chunk(decoded) == data
+
+
+@pytest.mark.parametrize('loctype', [x for x in LOCATOR_DATA if len(LOCATOR_DATA[x]) > 1])
+def test_locator_optional_trailing_values(p3d, loctype):
+    source = sample_chunk(LOC, loctype)
+    data_value = [x for x in source if x.get('Name') == 'Data'][0]
+    last = data_value[-1]
+    data_value.remove(last)
+    ET.SubElement(data_value, 'Value', Name=last.get('Name'))
+    data = p3d.encode_chunk(source)
+    decoded = p3d.decode_chunk(data)[0]
+    assert_same_values(source, decoded)
+    assert p3d.encode_chunk(decoded) == data
+
+
+@pytest.fixture(scope='module')
+def synthetic_maps(core, tmp_path_factory):
+    """returns (p3dxml path, p3d path) of the same small synthetic map"""
+    directory = tmp_path_factory.mktemp('synthetic')
+    paths = str(directory / 'map.p3dxml'), str(directory / 'map.p3d')
+    for path in paths:
+        core.utils_synthetic.write_synthetic_map(path, intersections=4, roads=4, segments=3, locators=1, paths=2, fences=2)
+    return paths
+
+
+def test_synthetic_locators_cover_locator_data(px, synthetic_maps):
+    loctypes = {int(px.find_val(x, 'LocatorType')) for x in px.find_chunks(px.terra_read(synthetic_maps[1]), LOC)}
+    assert set(LOCATOR_DATA) <= loctypes
+
+
+def test_p3d_reads_same_chunks_as_p3dxml(px, synthetic_maps):
+    xml_root, p3d_root = px.terra_read(synthetic_maps[0]), px.terra_read(synthetic_maps[1])
+    assert len(xml_root) == len(p3d_root)
+    for expected, actual in zip(xml_root, p3d_root):
+        assert_same_values(expected, actual)
+
+
+def test_p3d_file_round_trip(px, synthetic_maps, tmp_path):
+    out = str(tmp_path / 'rewritten.p3d')
+    px.write_ET(px.terra_read(synthetic_maps[1]), out)
+    with open(synthetic_maps[1], 'rb') as a, open(out, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_p3d_truncated_file(px, synthetic_maps, tmp_path):
+    with open(synthetic_maps[1], 'rb') as f:
+        data = f.read()
+    out = str(tmp_path / 'truncated.p3d')
+    with open(out, 'wb') as f:
+        f.write(data[:len(data) - 5])
+    with pytest.raises(ValueError, match='truncated'):
+        px.terra_read(out)
+
+
+@pytest.mark.parametrize('cut', [20, 58, 100, 333])
+def test_p3d_truncated_chunk(px, synthetic_maps, tmp_path, cut):
+    with open(synthetic_maps[1], 'rb') as f:
+        data = bytearray(f.read()[:cut])
+    # root size matching the cut, so only the chunk at the end is truncated
+    struct.pack_into('<I', data, 8, cut)
+    out = str(tmp_path / 'truncated.p3d')
+    with open(out, 'wb') as f:
+        f.write(data)
+    with pytest.raises(ValueError, match='Truncated chunk.* at offset'):
+        px.terra_read(out)
+
+
+def test_p3d_corrupt_chunk_data(px, synthetic_maps, tmp_path):
+    with open(synthetic_maps[1], 'rb') as f:
+        data = bytearray(f.read())
+    # data size of the first chunk too small for its fields
+    struct.pack_into('<I', data, 16, 14)
+    out = str(tmp_path / 'corrupt.p3d')
+    with open(out, 'wb') as f:
+        f.write(data)
+    with pytest.raises(ValueError, match='Corrupt chunk .* at offset 12'):
+        px.terra_read(out)
@@ -0,0 +1,139 @@
+import os
+import pytest
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+SYNTHETIC_SIZES = dict(intersections=6, roads=6, segments=3, locators=2, paths=3, fences=3)
+
+
+def minidom_write(root, filepath):
+    """write_ET before it got its own writer"""
+    with open(filepath, "w") as f:
+        f.write('\n'.join([line for line in minidom.parseString(ET.tostring(
+            root, 'unicode')).toprettyxml(indent='\t').split('\n') if line.strip()]))
+
+
+def normalised(chunk):
+    """returns chunk as bytes, without the whitespace after it"""
+    chunk.tail = None
+    return ET.tostring(chunk)
+
+
+@pytest.fixture(scope='module')
+def synthetic_map(core, tmp_path_factory):
+    filepath = str(tmp_path_factory.mktemp('synthetic') / 'map.p3dxml')
+    core.utils_synthetic.write_synthetic_map(filepath, **SYNTHETIC_SIZES)
+    return filepath
+
+
+@pytest.fixture
+def index_dir(px, tmp_path, monkeypatch):
+    """caches chunk indexes in a temporary directory for the test"""
+    monkeypatch.setattr(px, 'INDEX_DIR', str(tmp_path / 'index'))
+    monkeypatch.setattr(px, 'chunk_indices', {})
+    return px.INDEX_DIR
+
+
+def special_root(px):
+    """returns root ET with characters that need escaping, a comment and text nodes"""
+    root = px.p3d_et()
+    chunk = px.write_chunk(root, px.LOC)
+    px.write_val(chunk, 'Name', 'a&b <c> "d"')
+    px.write_xyz(chunk, 'Position', 1.5, -0.0, 2.25)
+    px.write_comment(chunk, ' generated ')
+    px.write_mat_xyz(chunk, 'Matrix', 3.0, 4.0, 5.0)
+    data = px.write_val(chunk, 'Data')
+    data.text = 'line 1\n\n  line 2'
+    px.write_chunk(root, px.INL)
+    return root
+
+
+def test_write_ET_matches_minidom(px, synthetic_map, tmp_path):
+    for name, root in [('synthetic', px.terra_read(synthetic_map)), ('special', special_root(px))]:
+        expected, actual = str(tmp_path / f'{name}_minidom.p3dxml'), str(tmp_path / f'{name}.p3dxml')
+        minidom_write(root, expected)
+        px.write_ET(root, actual)
+        with open(expected, 'rb') as a, open(actual, 'rb') as b:
+            assert a.read() == b.read(), name
+
+
+def test_p3d_writer_matches_write_ET(px, synthetic_map, tmp_path):
+    root = px.terra_read(synthetic_map)
+    px.write_ET(root, str(tmp_path / 'write_ET.p3dxml'))
+    with px.p3d_writer(str(tmp_path / 'p3d_writer.p3dxml')) as w:
+        for chunk in root:
+            w.write(chunk)
+    with open(tmp_path / 'write_ET.p3dxml', 'rb') as a, open(tmp_path / 'p3d_writer.p3dxml', 'rb') as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize('types', [['0x3000009'], ['0x3000009', '0x3000003'], ['0x3000005', '0x300000B', '0x3F00007'], ['0x1234']])
+def test_indexed_terra_iter_matches_full_parse(px, synthetic_map, index_dir, types):
+    expected = [normalised(x) for x in px.terra_read(synthetic_map) if x.get('Type') in types]
+    # streaming and recording the index, then reading it back from memory and from index_dir
+    assert [normalised(x) for x in px.terra_iter(synthetic_map, types)] == expected
+    for _ in range(2):
+        index = px.cached_chunk_index(synthetic_map)
+        assert [normalised(x) for x in px.terra_iter_indexed(synthetic_map, types, index)] == expected
+        assert [normalised(x) for x in px.terra_iter(synthetic_map, types)] == expected
+        px.chunk_indices.clear()
+    assert [normalised(x) for x in px.terra_iter(synthetic_map, types, use_index=False)] == expected
+
+
+def test_chunk_index_is_recorded_while_streaming(px, synthetic_map, index_dir):
+    assert px.cached_chunk_index(synthetic_map) is None
+    list(px.terra_iter(synthetic_map, [px.LOC]))
+    assert px.cached_chunk_index(synthetic_map) is not None
+    assert os.listdir(os.path.dirname(synthetic_map)) == [os.path.basename(synthetic_map)]
+    assert len(os.listdir(index_dir)) == 1
+
+
+def test_index_is_only_used_for_small_share(px, synthetic_map, index_dir, monkeypatch):
+    list(px.terra_iter(synthetic_map, [px.LOC]))
+    used = []
+    indexed = px.terra_iter_indexed
+    monkeypatch.setattr(px, 'terra_iter_indexed', lambda *args: used.append(args[1]) or indexed(*args))
+    all_types = [px.INS, px.RDS, px.ROA, px.LOC, px.PAT, px.FEN]
+    list(px.terra_iter(synthetic_map, [px.FEN]))
+    list(px.terra_iter(synthetic_map, all_types))
+    assert used == [[px.FEN]]
+
+
+def test_terra_iter_without_index(px, synthetic_map, tmp_path, monkeypatch):
+    # INDEX_DIR can't be created, so the index is only kept in memory
+    (tmp_path / 'file').write_text('')
+    monkeypatch.setattr(px, 'INDEX_DIR', str(tmp_path / 'file' / 'index'))
+    monkeypatch.setattr(px, 'chunk_indices', {})
+    expected = [normalised(x) for x in px.terra_read(synthetic_map) if x.get('Type') == px.PAT]
+    for _ in range(2):
+        assert [normalised(x) for x in px.terra_iter(synthetic_map, [px.PAT])] == expected
+    assert px.chunk_indices
+
+
+def test_single_line_file_isnt_indexed(px, synthetic_map, index_dir, tmp_path):
+    filepath = str(tmp_path / 'single_line.p3dxml')
+    root = px.terra_read(synthetic_map)
+    for elem in root.iter():
+        elem.text = elem.tail = None
+    with open(filepath, 'wb') as f:
+        f.write(ET.tostring(root))
+    expected = [normalised(x) for x in root if x.get('Type') == px.FEN]
+    assert [normalised(x) for x in px.terra_iter(filepath, [px.FEN])] == expected
+    assert px.cached_chunk_index(filepath) is None
+
+
+def test_terra_iter_clears_chunks(px, synthetic_map, index_dir, tmp_path):
+    p3d_map = str(tmp_path / 'map.p3d')
+    px.write_ET(px.terra_read(synthetic_map), p3d_map)
+    for filepath, use_index in [(synthetic_map, True), (synthetic_map, False), (p3d_map, True)]:
+        chunks = list(px.terra_iter(filepath, [px.ROA], use_index))
+        assert chunks and all(len(x) == 0 for x in chunks)
+
+
+def test_terra_read_strips_nul_junk(px, tmp_path):
+    filepath = tmp_path / 'junk.p3dxml'
+    filepath.write_bytes(b'<?xml version="1.0" ?>\n<Pure3DFile>\n\t<Chunk Type="0x3000008">\n'
+                         b'\t\t<Value Name="Name" Value="abc&#x0;\x01junk"/>\n\t</Chunk>\n</Pure3DFile>')
+    root = px.terra_read(str(filepath))
+    assert px.find_val(root[0], 'Name') == 'abc'
+    assert [normalised(x) for x in px.terra_iter(str(filepath), [px.INL])] == [normalised(root[0])]
@@ -0,0 +1,91 @@
+import io
+from bench_core import load_core
+
+core = load_core()
+px = core.utils_p3dxml
+encoder = __import__(f"{core.__name__}.utils_road_encoder", fromlist=['encode_roads'])
+
+INTERSECTIONS = [('Inter<0>', (0.0, 1.5, -2.0), 10.0, 3), ('Inter&1', (100.0, -0.0, 0.25), 7.5, 1)]
+
+
+def sample_roads(count=3):
+    """returns road dictionaries like RoadManager.snapshot_roads, origins include -0.0 coordinates"""
+    origins = [(0.0, -0.0, 0.0), (-0.0, 2.5, 0.0), (1.5, 2.0, 3.0)]
+    return [{
+        'name': f'Road"{r}"', 'start_inter': 'Inter<0>', 'end_inter': 'Inter&1', 'max_cars': 3, 'noreset': 0,
+        'speed': 50, 'intel': 2, 'unknown': 0, 'lanes': 1,
+        'shapes': [(f"Road{r}Shape{k}", origins[k % 3], (10.0, 0.0, 0.0), (10.0, 5.0, -0.0), (0.0, 5.0, 0.0)) for k in range(4)],
+    } for r in range(count)]
+
+
+def writer_output(inters, roads):
+    """returns what P3DXMLWriter wrote for road exports before utils_road_encoder"""
+    f = io.StringIO()
+    w = px.P3DXMLWriter(f)
+    w.tags.append('Pure3DFile')
+    for name, position, radius, behaviour in inters:
+        with w.chunk(px.INS):
+            w.val('Name', name)
+            w.xyz('Position', *position)
+            w.val('Radius', radius)
+            w.val('TrafficBehaviour', behaviour)
+    for road in roads:
+        for name, origin, p1, p2, p3 in road['shapes']:
+            with w.chunk(px.RDS):
+                w.val('Name', name)
+                w.val('Lanes', road['lanes'])
+                w.xyz('Position', *p1)
+                w.xyz('Position2', *p2)
+                w.xyz('Position3', *p3)
+        with w.chunk(px.ROA):
+            w.val('Name', road['name'])
+            w.val('StartIntersectionLocatorNode', road['start_inter'])
+            w.val('EndIntersectionLocatorNode', road['end_inter'])
+            w.val('MaximumCars', road['max_cars'])
+            w.val('NoReset', road['noreset'])
+            w.val('Unknown2', road['speed'])
+            w.val('Unknown3', road['intel'])
+            w.val('Unknown4', road['unknown'])
+            for name, origin, p1, p2, p3 in road['shapes']:
+                with w.chunk(px.RSG):
+                    w.val('Name', name)
+                    w.val('CubeShape', name)
+                    w.mat_xyz('Transform', *origin)
+                    w.mat_xyz('Unknown')
+    return f.getvalue()
+
+
+def test_encoder_matches_writer():
+    roads = sample_roads()
+    assert encoder.encode_intersections(INTERSECTIONS) + encoder.encode_roads(roads) == writer_output(INTERSECTIONS, roads)
+
+
+def test_write_road_matches_encoder():
+    roads = sample_roads()
+    f = io.StringIO()
+    w = px.P3DXMLWriter(f)
+    w.tags.append('Pure3DFile')
+    encoder.write_intersections(w, INTERSECTIONS)
+    for road in roads:
+        encoder.write_road(w, road)
+    assert f.getvalue() == encoder.encode_intersections(INTERSECTIONS) + encoder.encode_roads(roads)
+
+
+def test_binary_write_road_matches_parsed_fragments(p3d):
+    roads = sample_roads()
+    direct, parsed = io.BytesIO(), io.BytesIO()
+    w = p3d.P3DBinaryWriter(direct)
+    encoder.write_intersections(w, INTERSECTIONS)
+    for road in roads:
+        encoder.write_road(w, road)
+    w = p3d.P3DBinaryWriter(parsed)
+    for chunk in px.ET.fromstring(f"<Pure3DFile>{encoder.encode_intersections(INTERSECTIONS)}{encoder.encode_roads(roads)}</Pure3DFile>"):
+        w.write(chunk)
+    assert direct.getvalue() == parsed.getvalue()
+
+
+def test_parallel_encoding_matches_serial():
+    roads = sample_roads(20)
+    batches = list(encoder.encode_roads_parallel(roads, 2))
+    assert sum(count for count, _ in batches) == len(roads)
+    assert ''.join(fragment for _, fragment in batches) == encoder.encode_roads(roads)
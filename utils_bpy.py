@@ -1,6 +1,8 @@
 import bpy
 import os
+import numpy as np
 from os import path
+from bpy_extras.io_utils import ExportHelper
 
 def get_connected_verts(x : int,edges : bpy.types.MeshEdges):
     """return list of verts indexes that share an edge with vert x"""
@@ -17,6 +19,15 @@ def get_connected_faces(x : bpy.types.MeshPolygon, faces : bpy.types.MeshPolygon
     x_verts_set = set(x.vertices[:])
     return [f for f in faces if x_verts_set & set(f.vertices[:]) and f != x]
 
+def set_spline_points(spline, points):
+    """fills new spline with points at once, points is (N, 3) array-like"""
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    # float32 matches the spline point storage, foreach_set copies it without converting
+    co = np.ones((len(points), 4), dtype=np.float32)
+    co[:, :3] = points
+    spline.points.add(len(points)-1)
+    spline.points.foreach_set('co', co.ravel())
+
 def get_current_road_collection(context):
     """IF current selection is related to a proper road collection (active outliner collection, active object is inside a collection, etc.), returns that collection"""
     if len(context.selected_objects) >= 1 and context.selected_objects[0].users_collection[0].road_node_prop.to_export:
@@ -36,6 +47,30 @@ def get_col_parent(collection):
             return col
 
 
+class P3DExportHelper(ExportHelper):
+    """ExportHelper that writes either .p3dxml text or binary .p3d, picked by file_format"""
+    filename_ext = '.p3dxml'
+    filter_glob: bpy.props.StringProperty(
+        default='*.p3dxml;*.p3d',
+        options={'HIDDEN'},
+        maxlen=255,
+        )
+    file_format: bpy.props.EnumProperty(
+        items=[
+            ('.p3dxml', 'P3DXML', 'Pure3D xml text'),
+            ('.p3d', 'P3D', 'Binary Pure3D'),
+            ],
+        name='Format',
+        description='File format to export to',
+        default='.p3dxml',
+        )
+
+    def check(self, context):
+        # ExportHelper.check enforces filename_ext on the filepath
+        self.filename_ext = self.file_format
+        return super().check(context)
+
+
 pcoll = bpy.utils.previews.new()
 icons_dir = path.join(path.dirname(__file__), 'icons')
 for icon in [path.splitext(icon)[0] for icon in os.listdir(icons_dir) if path.splitext(icon)[1] == '.png']:
@@ -1,5 +1,8 @@
 from math import *
-from mathutils import *
+try:
+    from mathutils import *
+except ImportError:  # outside Blender
+    from .utils_mathutils import *
 import numpy as np
 
 
@@ -124,3 +127,23 @@ def is_connected(graph):
         return True
     else:
         return set(graph).difference(set(island))
+
+
+def connected_components(nodes, edges):
+    """returns list of sets of nodes connected by edges (pairs of nodes), largest first. union-find, O(N + E)"""
+    parent = {n: n for n in nodes}
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for a, b in edges:
+        ra, rb = find(parent.setdefault(a, a)), find(parent.setdefault(b, b))
+        if ra != rb:
+            parent[ra] = rb
+    components = {}
+    for n in parent:
+        components.setdefault(find(n), set()).add(n)
+    return sorted(components.values(), key=len, reverse=True)
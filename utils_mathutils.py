@@ -0,0 +1,343 @@
+"""Pure Python stand-in for the parts of Blender's mathutils used by utils_p3dxml and utils_math,
+so they can be imported (and benchmarked) without Blender. Same conventions as mathutils:
+components are stored as float32, matrices are indexed [row][column] and Euler angles are XYZ"""
+import math
+from array import array
+
+__all__ = ['Vector', 'Matrix', 'Euler', 'Quaternion']
+
+
+def _axis(i):
+    return property(lambda self: self._v[i], lambda self, value: self._v.__setitem__(i, value))
+
+
+class Vector:
+    __slots__ = ('_v',)
+
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._v = array('f', seq)
+
+    @classmethod
+    def _wrap(cls, data):
+        """returns vector sharing data (used for matrix rows, so writes go through)"""
+        v = cls.__new__(cls)
+        v._v = data
+        return v
+
+    x, y, z, w = _axis(0), _axis(1), _axis(2), _axis(3)
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._v[i])
+        return self._v[i]
+
+    def __setitem__(self, i, value):
+        self._v[i] = value
+
+    def __repr__(self):
+        return f"Vector({tuple(self._v)})"
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self._v == other._v
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self._v, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self._v, other))
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return Vector(a * b for a, b in zip(self._v, other._v))
+        return Vector(a * other for a in self._v)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector(a / other for a in self._v)
+
+    def __neg__(self):
+        return Vector(-a for a in self._v)
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    def __iadd__(self, other):
+        for i, b in enumerate(other):
+            self._v[i] += b
+        return self
+
+    def __isub__(self, other):
+        for i, b in enumerate(other):
+            self._v[i] -= b
+        return self
+
+    def __imul__(self, other):
+        for i in range(len(self._v)):
+            self._v[i] *= other
+        return self
+
+    def __itruediv__(self, other):
+        for i in range(len(self._v)):
+            self._v[i] /= other
+        return self
+
+    def copy(self):
+        return Vector(self._v)
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._v, other))
+
+    def cross(self, other):
+        ax, ay, az = self._v[:3]
+        bx, by, bz = tuple(other)[:3]
+        return Vector((ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx))
+
+    @property
+    def length(self):
+        return math.sqrt(self.length_squared)
+
+    @property
+    def length_squared(self):
+        return sum(a * a for a in self._v)
+
+    def normalize(self):
+        length = self.length
+        if length:
+            self /= length
+
+    def normalized(self):
+        v = self.copy()
+        v.normalize()
+        return v
+
+    def rotate(self, other):
+        """rotates in place by Euler, Quaternion or Matrix"""
+        mat = other if isinstance(other, Matrix) else other.to_matrix()
+        self._v[:3] = array('f', mat.to_3x3() @ Vector(self._v[:3]))
+
+    def to_2d(self):
+        return Vector(self._v[:2])
+
+    def to_3d(self):
+        return Vector((tuple(self._v) + (0.0, 0.0, 0.0))[:3])
+
+    def to_4d(self):
+        return Vector((tuple(self._v) + (0.0, 0.0, 0.0))[:3] + (1.0,))
+
+    def to_tuple(self, precision=-1):
+        return tuple(self._v) if precision == -1 else tuple(round(a, precision) for a in self._v)
+
+
+class Matrix:
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = [[float(i == j) for j in range(4)] for i in range(4)]
+        self._rows = [array('f', row) for row in rows]
+
+    @classmethod
+    def Identity(cls, size):
+        return cls([[float(i == j) for j in range(size)] for i in range(size)])
+
+    @classmethod
+    def Translation(cls, vector):
+        mat = cls()
+        for i, a in enumerate(tuple(vector)[:3]):
+            mat._rows[i][3] = a
+        return mat
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return (Vector._wrap(row) for row in self._rows)
+
+    def __getitem__(self, i):
+        return Vector._wrap(self._rows[i])
+
+    def __setitem__(self, i, row):
+        self._rows[i][:] = array('f', row)
+
+    def __repr__(self):
+        return f"Matrix({tuple(tuple(row) for row in self._rows)})"
+
+    def __eq__(self, other):
+        return isinstance(other, Matrix) and self._rows == other._rows
+
+    __hash__ = None
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            cols = list(zip(*other._rows))
+            return Matrix([[sum(a * b for a, b in zip(row, col)) for col in cols] for row in self._rows])
+        vec = tuple(other)
+        if len(vec) == len(self._rows) - 1:
+            # homogeneous coordinates, like mathutils 4x4 @ 3D vector
+            return Vector(sum(a * b for a, b in zip(row, vec + (1.0,))) for row in self._rows[:len(vec)])
+        return Vector(sum(a * b for a, b in zip(row, vec)) for row in self._rows)
+
+    @property
+    def col(self):
+        return [Vector(col) for col in zip(*self._rows)]
+
+    def copy(self):
+        return Matrix(self._rows)
+
+    def transposed(self):
+        return Matrix(zip(*self._rows))
+
+    def to_3x3(self):
+        return Matrix(row[:3] for row in self._rows[:3])
+
+    def to_4x4(self):
+        mat = Matrix()
+        for i, row in enumerate(self._rows[:4]):
+            mat._rows[i][:len(row)] = row
+        return mat
+
+    def to_translation(self):
+        return Vector(row[3] for row in self._rows[:3])
+
+    def to_scale(self):
+        return Vector(math.sqrt(sum(row[j] ** 2 for row in self._rows[:3])) for j in range(3))
+
+    def to_quaternion(self):
+        """returns rotation of 3x3 part with its columns normalized"""
+        cols = [Vector(col).normalized() for col in list(zip(*self._rows[:3]))[:3]]
+        m = [[cols[j][i] for j in range(3)] for i in range(3)]
+        if m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1]) - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0]) + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]) < 0:
+            m = [[-a for a in row] for row in m]
+        trace = m[0][0] + m[1][1] + m[2][2]
+        if trace > 0:
+            s = 2.0 * math.sqrt(1.0 + trace)
+            q = (0.25 * s, (m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s)
+        elif m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2])
+            q = ((m[2][1] - m[1][2]) / s, 0.25 * s, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s)
+        elif m[1][1] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2])
+            q = ((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s, 0.25 * s, (m[1][2] + m[2][1]) / s)
+        else:
+            s = 2.0 * math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1])
+            q = ((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, 0.25 * s)
+        if q[0] < 0:
+            q = tuple(-a for a in q)
+        return Quaternion(q)
+
+    def to_euler(self, order='XYZ'):
+        return self.to_quaternion().to_euler(order)
+
+
+class Quaternion:
+    __slots__ = ('_v',)
+
+    def __init__(self, seq=(1.0, 0.0, 0.0, 0.0)):
+        self._v = array('f', seq)
+
+    w, x, y, z = _axis(0), _axis(1), _axis(2), _axis(3)
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        return self._v[i]
+
+    def __setitem__(self, i, value):
+        self._v[i] = value
+
+    def __repr__(self):
+        return f"Quaternion({tuple(self._v)})"
+
+    def __eq__(self, other):
+        return isinstance(other, Quaternion) and self._v == other._v
+
+    __hash__ = None
+
+    def copy(self):
+        return Quaternion(self._v)
+
+    def normalized(self):
+        length = math.sqrt(sum(a * a for a in self._v))
+        return Quaternion(a / length for a in self._v) if length else self.copy()
+
+    def to_matrix(self):
+        w, x, y, z = self.normalized()
+        return Matrix((
+            (1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)),
+            (2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)),
+            (2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)),
+        ))
+
+    def to_euler(self, order='XYZ'):
+        """returns the XYZ solution with the smallest sum of absolute angles, like mathutils"""
+        if order != 'XYZ':
+            raise NotImplementedError(f"Euler order {order} isn't supported without mathutils")
+        m = self.to_matrix()
+        cy = math.hypot(m[0][0], m[1][0])
+        if cy > 16 * 1.1920929e-07:
+            eul1 = (math.atan2(m[2][1], m[2][2]), math.atan2(-m[2][0], cy), math.atan2(m[1][0], m[0][0]))
+            eul2 = (math.atan2(-m[2][1], -m[2][2]), math.atan2(-m[2][0], -cy), math.atan2(-m[1][0], -m[0][0]))
+        else:
+            eul1 = eul2 = (math.atan2(-m[1][2], m[1][1]), math.atan2(-m[2][0], cy), 0.0)
+        return Euler(min(eul1, eul2, key=lambda e: sum(map(abs, e))))
+
+
+class Euler:
+    __slots__ = ('_v', 'order')
+
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        if order != 'XYZ':
+            raise NotImplementedError(f"Euler order {order} isn't supported without mathutils")
+        self._v = array('f', angles)
+        self.order = order
+
+    x, y, z = _axis(0), _axis(1), _axis(2)
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        return self._v[i]
+
+    def __setitem__(self, i, value):
+        self._v[i] = value
+
+    def __repr__(self):
+        return f"Euler({tuple(self._v)}, '{self.order}')"
+
+    def __eq__(self, other):
+        return isinstance(other, Euler) and self._v == other._v
+
+    __hash__ = None
+
+    def copy(self):
+        return Euler(self._v)
+
+    def to_matrix(self):
+        ci, cj, ch = (math.cos(a) for a in self._v)
+        si, sj, sh = (math.sin(a) for a in self._v)
+        cc, cs, sc, ss = ci * ch, ci * sh, si * ch, si * sh
+        return Matrix((
+            (cj * ch, sj * sc - cs, sj * cc + ss),
+            (cj * sh, sj * ss + cc, sj * cs - sc),
+            (-sj, cj * si, cj * ci),
+        ))
+
+    def to_quaternion(self):
+        return self.to_matrix().to_quaternion()
@@ -0,0 +1,348 @@
+"""Binary Pure3D (.p3d) reader/writer for map data chunks.
+Chunks are converted to/from the same ET layout p3dxml uses, so importers and exporters work on both formats"""
+import base64
+import mmap
+import os
+import struct
+from .utils_p3dxml import *
+
+P3D_ROOT = 0xFF443350  # 'P3D\xff'
+HEADER = struct.Struct('<III')  # chunk id, data size (header + data), chunk size (header + data + children)
+
+# Field layouts of known chunk types, in binary order (same as the order of values in p3dxml).
+# Field kinds:
+#   string      - 1 byte length + NUL padded characters
+#   u8/i8/u32/i32/f32
+#   vec3        - 3 floats as X, Y, Z
+#   mat4        - 16 floats as M11..M44
+#   vec3_list   - u32 count + vec3 array, as Value with Items
+#   b64         - rest of chunk data, base64 encoded
+#   count:TYPE  - u32 number of TYPE child chunks, computed when writing
+#   locator     - u32 count + u32 array of locator type specific data, see LOCATOR_DATA
+CHUNK_LAYOUTS = {
+    INS: (('Name', 'string'), ('Position', 'vec3'), ('Radius', 'f32'), ('TrafficBehaviour', 'u32')),
+    RDS: (('Name', 'string'), ('Unknown', 'u32'), ('Lanes', 'u32'), ('Unknown2', 'u32'),
+          ('Position', 'vec3'), ('Position2', 'vec3'), ('Position3', 'vec3')),
+    ROA: (('Name', 'string'), ('Unknown', 'u32'), ('StartIntersectionLocatorNode', 'string'), ('EndIntersectionLocatorNode', 'string'),
+          ('MaximumCars', 'u32'), ('NoReset', 'u8'), ('Unknown2', 'u8'), ('Unknown3', 'u8'), ('Unknown4', 'u8')),
+    RSG: (('Name', 'string'), ('CubeShape', 'string'), ('Transform', 'mat4'), ('Unknown', 'mat4')),
+    PAT: (('Positions', 'vec3_list'),),
+    FEN: (),
+    FEN2: (('Start', 'vec3'), ('End', 'vec3'), ('Normal', 'vec3')),
+    LOC: (('Name', 'string'), ('LocatorType', 'u32'), ('Data', 'locator'), ('Position', 'vec3'), ('NumTriggers', f'count:{VOL}')),
+    VOL: (('Name', 'string'), ('IsRect', 'u32'), ('HalfExtents', 'vec3'), ('Matrix', 'mat4')),
+    LOM: (('Matrix', 'mat4'),),
+    '0x3000007': (('Name', 'string'), ('Positions', 'vec3_list')),  # Spline
+    '0x300000A': (('Name', 'string'), ('Data', 'b64')),  # Rail Cam
+    '0x3F00004': (('NumNodes', 'count:0x3F00005'), ('WorldBoundsMinimum', 'vec3'), ('WorldBoundsMaximum', 'vec3')),  # Tree
+    '0x3F00005': (('ChildCount', 'u32'), ('ParentOffset', 'i32')),  # Tree Node
+    '0x3F00006': (('Axis', 'i8'), ('Position', 'f32'), ('StaticWorldMeshLimit', 'u32'), ('StaticWorldPropLimit', 'u32'),
+                  ('GroundCollisionLimit', 'u32'), ('CharactersCarsAndBreakableWorldPropLimit', 'u32'), ('WallCollisionLimit', 'u32'),
+                  ('RoadNodeSegmentLimit', 'u32'), ('PedNodeSegmentLimit', 'u32'), ('WorldMeshLimit', 'u32')),  # Tree Node 2
+    '0x10003': (('Low', 'vec3'), ('High', 'vec3')),  # Bounding Box
+    INL: (('Name', 'string'),),
+    '0x120100': (('Name', 'string'), ('Data', 'b64')),  # Old Scenegraph
+    '0x120101': (('Data', 'b64'),),  # Old Scenegraph Root
+    '0x120102': (('Name', 'string'), ('NumChildren', 'count:0x120103')),  # Old Scenegraph Branch
+    '0x120103': (('Name', 'string'), ('NumChildren', 'count:0x120103'), ('Transform', 'mat4')),  # Old Scenegraph Transform
+    '0x120107': (('Name', 'string'), ('DrawableName', 'string'), ('IsTranslucent', 'u32')),  # Old Scenegraph Drawable
+    '0x12010A': (('SortOrder', 'f32'),),  # Old Scenegraph Sort Order
+}
+
+# Locator 'Data' layouts by LocatorType. Trailing fields are optional, p3dxml keeps missing ones as Values without Value
+# Strings in locator data are NUL terminated and padded to 4 bytes (see read_data_string) instead of length prefixed
+# Extra kinds: items3 - 3 vec3 as Value with Items, strings3 - 3 strings as Value with Items
+LOCATOR_DATA = {
+    0: (('Unknown', 'u32'), ('Unknown2', 'u32')),
+    1: (('Unknown', 'string'),),
+    3: (('Rotation', 'f32'), ('ParkedCar', 'u32'), ('FreeCar', 'string')),
+    5: (('DynaLoadData', 'string'),),
+    6: (('Occlusions', 'u32'),),
+    7: (('InteriorName', 'string'), ('Matrix', 'items3')),
+    8: (('Matrix', 'items3'),),
+    9: (('Unknown', 'strings3'), ('Unknown2', 'u32'), ('Unknown3', 'u32')),
+    12: (('TargetPosition', 'vec3'), ('FOV', 'f32'), ('Unknown', 'f32'), ('FollowPlayer', 'u32'), ('Unknown2', 'f32'),
+         ('Unknown3', 'u32'), ('Unknown4', 'u32'), ('Unknown5', 'u32')),
+    13: (('Unknown', 'u32'),),
+}
+
+SCALARS = {'u8': struct.Struct('<B'), 'i8': struct.Struct('<b'), 'u32': struct.Struct('<I'), 'i32': struct.Struct('<i'), 'f32': struct.Struct('<f')}
+VEC3 = struct.Struct('<3f')
+MAT4 = struct.Struct('<16f')
+MAT4_KEYS = [f"M{i + 1}{j + 1}" for i in range(4) for j in range(4)]
+
+
+def chunk_type_str(chunk_id):
+    return f"0x{chunk_id:X}"
+
+
+def read_string(data, offset):
+    """returns (string, offset after it) of Pure3D string at offset"""
+    length = data[offset]
+    raw = bytes(data[offset + 1:offset + 1 + length])
+    return raw.split(b'\0', 1)[0].decode('latin-1'), offset + 1 + length
+
+
+def pack_string(text):
+    raw = text.encode('latin-1')
+    return bytes([len(raw) // 4 * 4 + 4]) + raw.ljust(len(raw) // 4 * 4 + 4, b'\0')
+
+
+def read_data_string(data, offset):
+    """returns (string, offset after it) of NUL terminated string padded to 4 bytes, as used in locator data"""
+    end = bytes(data[offset:]).find(b'\0')
+    end = len(data) if end == -1 else offset + end
+    return bytes(data[offset:end]).decode('latin-1'), (end // 4 + 1) * 4
+
+
+def pack_data_string(text):
+    raw = text.encode('latin-1')
+    return raw.ljust(len(raw) // 4 * 4 + 4, b'\0')
+
+
+def xyz_attrib(x, y, z):
+    return {'X': str(x), 'Y': str(y), 'Z': str(z)}
+
+
+def decode_field(chunk, name, kind, data, offset, values):
+    """decodes field at offset of data into a Value of chunk, returns offset after it"""
+    if kind == 'string':
+        value, offset = read_string(data, offset)
+        ET.SubElement(chunk, 'Value', Name=name, Value=value)
+    elif kind in SCALARS or kind.startswith('count:'):
+        scalar = SCALARS.get(kind, SCALARS['u32'])
+        value = scalar.unpack_from(data, offset)[0]
+        ET.SubElement(chunk, 'Value', Name=name, Value=str(value))
+        offset += scalar.size
+    elif kind == 'vec3':
+        ET.SubElement(chunk, 'Value', Name=name, **xyz_attrib(*VEC3.unpack_from(data, offset)))
+        offset += VEC3.size
+    elif kind == 'mat4':
+        ET.SubElement(chunk, 'Value', Name=name, **dict(zip(MAT4_KEYS, map(str, MAT4.unpack_from(data, offset)))))
+        offset += MAT4.size
+    elif kind == 'vec3_list':
+        count = SCALARS['u32'].unpack_from(data, offset)[0]
+        offset += 4
+        positions = ET.SubElement(chunk, 'Value', Name=name)
+        for i in range(count):
+            ET.SubElement(positions, 'Item', **xyz_attrib(*VEC3.unpack_from(data, offset)))
+            offset += VEC3.size
+    elif kind == 'b64':
+        ET.SubElement(chunk, 'Value', Name=name, Value=base64.standard_b64encode(bytes(data[offset:])).decode('ascii'))
+        offset = len(data)
+    elif kind == 'items3':
+        matrix = ET.SubElement(chunk, 'Value', Name=name)
+        for i in range(3):
+            ET.SubElement(matrix, 'Item', **xyz_attrib(*VEC3.unpack_from(data, offset)))
+            offset += VEC3.size
+    elif kind == 'strings3':
+        items = ET.SubElement(chunk, 'Value', Name=name)
+        for i in range(3):
+            value, offset = read_data_string(data, offset)
+            ET.SubElement(items, 'Item', Value=value)
+    elif kind == 'locator':
+        count = SCALARS['u32'].unpack_from(data, offset)[0]
+        offset += 4
+        loc_data = ET.SubElement(chunk, 'Value', Name=name)
+        sub_data = data[offset:offset + count * 4]
+        sub_offset = 0
+        for sub_name, sub_kind in LOCATOR_DATA.get(int(values['LocatorType']), ()):
+            if sub_offset >= len(sub_data):
+                ET.SubElement(loc_data, 'Value', Name=sub_name)
+            elif sub_kind == 'string':
+                value, sub_offset = read_data_string(sub_data, sub_offset)
+                ET.SubElement(loc_data, 'Value', Name=sub_name, Value=value)
+            else:
+                sub_offset = decode_field(loc_data, sub_name, sub_kind, sub_data, sub_offset, values)
+        offset += count * 4
+    values[name] = chunk[-1].get('Value')
+    return offset
+
+
+def encode_field(chunk, name, kind, value_el):
+    """returns bytes of field of chunk, value_el is the Value named name (None if missing, default value is used)"""
+    attrib = value_el.attrib if value_el is not None else {}
+    if kind == 'string':
+        return pack_string(attrib.get('Value', ''))
+    if kind.startswith('count:'):
+        return SCALARS['u32'].pack(len(find_chunks(chunk, kind[6:])))
+    if kind in SCALARS:
+        value = attrib.get('Value', 0)
+        return SCALARS[kind].pack(float(value) if kind == 'f32' else int(value))
+    if kind == 'vec3':
+        return VEC3.pack(*(float(attrib.get(k, 0)) for k in 'XYZ'))
+    if kind == 'mat4':
+        identity = [1.0 if i == j else 0.0 for i in range(4) for j in range(4)]
+        return MAT4.pack(*(float(attrib.get(k, d)) for k, d in zip(MAT4_KEYS, identity)))
+    if kind == 'vec3_list':
+        items = list(value_el) if value_el is not None else []
+        return SCALARS['u32'].pack(len(items)) + b''.join(VEC3.pack(*(float(i.get(k, 0)) for k in 'XYZ')) for i in items)
+    if kind == 'b64':
+        return base64.standard_b64decode(attrib.get('Value', ''))
+    if kind == 'items3':
+        return b''.join(VEC3.pack(*(float(i.get(k, 0)) for k in 'XYZ')) for i in list(value_el)[:3])
+    if kind == 'strings3':
+        return b''.join(pack_data_string(i.get('Value', '')) for i in list(value_el)[:3])
+    if kind == 'locator':
+        sub_data = b''
+        if value_el is not None:
+            named = named_children(value_el)
+            for sub_name, sub_kind in LOCATOR_DATA.get(int(find_val(chunk, 'LocatorType')), ()):
+                sub_el = named.get(sub_name)
+                # optional trailing values are written without Value (or Items)
+                if sub_el is None or not (len(sub_el) if sub_kind in ('items3', 'strings3') else 'Value' in sub_el.attrib or 'X' in sub_el.attrib):
+                    break
+                if sub_kind == 'string':
+                    sub_data += pack_data_string(sub_el.get('Value'))
+                else:
+                    sub_data += encode_field(value_el, sub_name, sub_kind, sub_el)
+        return SCALARS['u32'].pack(len(sub_data) // 4) + sub_data
+    raise ValueError(f"Unknown field kind {kind}")
+
+
+def decode_chunk(data, offset=0):
+    """decodes chunk at offset of data (bytes or memoryview) with all of its children. returns (chunk ET, offset after it)"""
+    chunk_id, data_size, chunk_size = HEADER.unpack_from(data, offset)
+    chunk_type = chunk_type_str(chunk_id)
+    chunk = ET.Element('Chunk', Type=chunk_type)
+    chunk_data = data[offset + HEADER.size:offset + data_size]
+    layout = CHUNK_LAYOUTS.get(chunk_type)
+    if layout is None:
+        ET.SubElement(chunk, 'Value', Name='Data', Value=base64.standard_b64encode(bytes(chunk_data)).decode('ascii'))
+    else:
+        values = {}
+        field_offset = 0
+        for name, kind in layout:
+            field_offset = decode_field(chunk, name, kind, chunk_data, field_offset, values)
+    for _, child_offset, _, _ in walk_chunks(data, offset + data_size, offset + chunk_size):
+        chunk.append(decode_chunk(data, child_offset)[0])
+    return chunk, offset + chunk_size
+
+
+def encode_chunk(chunk):
+    """returns bytes of chunk ET with all of its children"""
+    chunk_type = chunk.get('Type')
+    layout = CHUNK_LAYOUTS.get(chunk_type)
+    named = named_children(chunk)
+    if layout is None:
+        data = encode_field(chunk, 'Data', 'b64', named.get('Data'))
+    else:
+        data = b''.join(encode_field(chunk, name, kind, named.get(name)) for name, kind in layout)
+    children = b''.join(encode_chunk(x) for x in chunk if x.tag == 'Chunk')
+    data_size = HEADER.size + len(data)
+    return HEADER.pack(int(chunk_type, 16), data_size, data_size + len(children)) + data + children
+
+
+def p3d_read(fp):
+    """reads ENTIRE .p3d, returns ET in the same layout terra_read returns"""
+    root = p3d_et()
+    # a list, ET.extend hides errors raised by a generator behind a TypeError
+    root.extend(list(p3d_iter(fp)))
+    return root
+
+
+def p3d_write(root, filepath):
+    """writes every chunk of root ET element into a .p3d file at filepath"""
+    with open(filepath, 'wb') as f:
+        f.write(HEADER.pack(P3D_ROOT, HEADER.size, HEADER.size))
+        size = HEADER.size
+        for chunk in root:
+            if chunk.tag == 'Chunk':
+                data = encode_chunk(chunk)
+                f.write(data)
+                size += len(data)
+        f.seek(0)
+        f.write(HEADER.pack(P3D_ROOT, HEADER.size, size))
+
+
+class P3DBinaryWriter(P3DWriter):
+    """Same interface as P3DXMLWriter (except write_raw), but writes binary chunks into a .p3d file.
+    Each top level chunk is kept as ET until it's closed, then encoded and dropped"""
+
+    def __init__(self, f):
+        self.f = f
+        self.stack = []
+        self.size = HEADER.size
+
+    def start(self, tag, attrib):
+        elem = ET.Element(tag, attrib)
+        if self.stack:
+            self.stack[-1].append(elem)
+        self.stack.append(elem)
+
+    def end(self):
+        elem = self.stack.pop()
+        if not self.stack and elem.tag == 'Chunk':
+            self.write(elem)
+
+    def write(self, elem):
+        if self.stack:
+            self.stack[-1].append(elem)
+            return
+        data = encode_chunk(elem)
+        self.f.write(data)
+        self.size += len(data)
+
+
+@contextmanager
+def p3d_binary_writer(filepath):
+    """opens .p3d filepath for writing and yields P3DBinaryWriter"""
+    with open(filepath, 'wb') as f:
+        f.write(HEADER.pack(P3D_ROOT, HEADER.size, HEADER.size))
+        writer = P3DBinaryWriter(f)
+        yield writer
+        f.seek(0)
+        f.write(HEADER.pack(P3D_ROOT, HEADER.size, writer.size))
+
+
+def walk_chunks(data, offset, end):
+    """yields (chunk id, offset, data size, chunk size) of every chunk between offset and end of data,
+    reading only chunk headers. Raises ValueError naming the offset of a truncated or corrupt chunk"""
+    while offset < end:
+        if offset + HEADER.size > end:
+            raise ValueError(f"Truncated chunk header at offset {offset}")
+        chunk_id, data_size, chunk_size = HEADER.unpack_from(data, offset)
+        if not HEADER.size <= data_size <= chunk_size:
+            raise ValueError(f"Corrupt chunk 0x{chunk_id:X} at offset {offset}")
+        if offset + chunk_size > end:
+            raise ValueError(f"Truncated chunk 0x{chunk_id:X} at offset {offset}")
+        yield chunk_id, offset, data_size, chunk_size
+        offset += chunk_size
+
+
+@contextmanager
+def p3d_view(fp):
+    """memory maps .p3d at fp and yields memoryview of it, so only touched pages are read"""
+    with open(fp, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"{fp} is not a Pure3D file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            if HEADER.unpack_from(view, 0)[0] != P3D_ROOT:
+                raise ValueError(f"{fp} is not a Pure3D file")
+            yield view
+
+
+def p3d_iter(fp, types=None):
+    """same as terra_iter for .p3d files. Top level chunk headers are walked over a memory map
+    and only chunks of given types are decoded"""
+    type_ids = None if types is None else {int(t, 16) for t in types}
+    error = None
+    with p3d_view(fp) as view:
+        root_id, data_size, chunk_size = HEADER.unpack_from(view, 0)
+        if chunk_size > len(view):
+            raise ValueError(f"{fp} is truncated at offset {len(view)} of {chunk_size}")
+        # errors are raised only after leaving the except block: its traceback keeps slices of view alive
+        # and the memory map can't be closed while they exist
+        try:
+            for chunk_id, offset, _, _ in walk_chunks(view, data_size, chunk_size):
+                if type_ids is None or chunk_id in type_ids:
+                    try:
+                        chunk = decode_chunk(view, offset)[0]
+                    except struct.error as e:
+                        error = f"Corrupt chunk 0x{chunk_id:X} at offset {offset}: {e}"
+                        break
+                    yield chunk
+        except ValueError as e:
+            error = str(e)
+    if error is not None:
+        raise ValueError(f"{fp}: {error}")
@@ -1,11 +1,20 @@
-from xml.dom import minidom
 import re
 import os
 import base64
 import struct
 import math
-from mathutils import Matrix, Vector
+import json
+import hashlib
+import tempfile
+import weakref
+from contextlib import contextmanager
+try:
+    from mathutils import Matrix, Vector
+except ImportError:  # outside Blender
+    from .utils_mathutils import Matrix, Vector
+import numpy as np
 import xml.etree.cElementTree as ET
+from .utils_profile import phase, phase_iter, traced
 RDS = '0x3000009'  # Road Data Segment
 INS = '0x3000004'  # Intersection
 ROA = '0x3000003'  # Road (Node)
@@ -16,10 +25,16 @@ FEN2 = '0x3000000'  # Fence 2
 LOC = '0x3000005'  # Locator
 VOL = '0x3000006'  # Trigger Volume
 LOM = '0x300000C'  # Locator Matrix
+INL = '0x3000008'  # Instance List
 # Only used in splitter operator (Deprecated soon)
 RoadChunks = [RDS, INS, ROA, RSG, PAT, FEN, FEN2, LOC]
 
 
+def is_p3d(filepath):
+    """returns True if filepath is a binary Pure3D file rather than p3dxml"""
+    return filepath.lower().endswith('.p3d')
+
+
 def p3d_et(ver=4.4):
     return ET.Element('Pure3DFile', LucasPure3DEditorVersion=(str(ver)))
 
@@ -41,17 +56,25 @@ def write_xyz(loc, name, x, y, z, element='Value'):
 
 
 
-def write_mat_xyz(loc, name, x=0, y=0, z=0):
-    """returns a value ET element with Name=name and set XYZ as M41, M42 and M43 at loc. SWAPS Y AND Z"""
+def mat_xyz_attrib(x=0, y=0, z=0):
+    """returns M11..M44 attributes of identity matrix with XYZ as M41, M42 and M43. SWAPS Y AND Z"""
     mat = Matrix()
     if not (x == y == z == 0):
         mat[3][0] = x
         mat[3][2] = y
         mat[3][1] = z
-    tran = ET.SubElement(loc, "Value", Name=name)
+    attrib = {}
     for i, row in enumerate(mat):
         for j, cell in enumerate(row):
-            tran.set(f"M{i + 1}{j + 1}", str(cell))
+            attrib[f"M{i + 1}{j + 1}"] = str(cell)
+    return attrib
+
+
+def write_mat_xyz(loc, name, x=0, y=0, z=0):
+    """returns a value ET element with Name=name and set XYZ as M41, M42 and M43 at loc. SWAPS Y AND Z"""
+    tran = ET.SubElement(loc, "Value", Name=name)
+    for key, cell in mat_xyz_attrib(x, y, z).items():
+        tran.set(key, cell)
     return tran
 
 
@@ -65,23 +88,204 @@ def write_chunk(loc, chunk_type: str):
     return ET.SubElement(loc, 'Chunk', Type=chunk_type)
 
 
+XML_DECLARATION = '<?xml version="1.0" ?>'
+
+
+def escape_xml(text):
+    """escapes text or attribute value the same way minidom does"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+
+def write_text(f, text, indent):
+    """writes non-blank lines of text node at indent, each on its own line"""
+    for line in (indent + escape_xml(text)).split('\n'):
+        if line.strip():
+            f.write('\n' + line)
+
+
+def write_element(f, elem, depth):
+    """writes elem with all of its children into file f, tab indented at depth. Every line is prefixed with a newline"""
+    indent = '\t' * depth
+    if elem.tag is ET.Comment:
+        f.write(f"\n{indent}<!--{elem.text}-->")
+        return
+    f.write(f"\n{indent}<{elem.tag}")
+    for name, value in elem.items():
+        f.write(f' {name}="{escape_xml(value)}"')
+    if len(elem) == 0:
+        if not elem.text:
+            f.write('/>')
+            return
+        # single text node is written inline, blank lines in between are dropped
+        lines = escape_xml(elem.text).split('\n')
+        f.write('>' + lines[0])
+        for line in lines[1:-1]:
+            if line.strip():
+                f.write('\n' + line)
+        if len(lines) > 1:
+            f.write('\n' + lines[-1])
+        f.write(f"</{elem.tag}>")
+        return
+    f.write('>')
+    if elem.text:
+        write_text(f, elem.text, indent + '\t')
+    for child in elem:
+        write_element(f, child, depth + 1)
+        if child.tail:
+            write_text(f, child.tail, indent + '\t')
+    f.write(f"\n{indent}</{elem.tag}>")
+
+
+@traced
 def write_ET(root, filepath):
-    """writes entire root ET element into a file at filepath"""
-    with open(filepath, "w") as f:
-        f.write('\n'.join([line for line in minidom.parseString(ET.tostring(
-            root, 'unicode')).toprettyxml(indent='\t').split('\n') if line.strip()]))
-        f.close()
+    """writes entire root ET element into a file at filepath (binary if it's .p3d)"""
+    with phase('write'):
+        if is_p3d(filepath):
+            from .utils_p3d import p3d_write
+            return p3d_write(root, filepath)
+        with open(filepath, "w", buffering=1 << 16) as f:
+            f.write(XML_DECLARATION)
+            write_element(f, root, 0)
+
+
+class P3DWriter:
+    """Base of streaming writers, mirrors write_chunk/write_val/write_xyz/write_mat_xyz without building an ET.
+    Subclasses implement start(tag, attrib), end() and write(elem). Use via p3d_writer"""
+
+    def start(self, tag, attrib):
+        raise NotImplementedError
+
+    def end(self):
+        raise NotImplementedError
+
+    def write(self, elem):
+        """writes already built ET element with all of its children"""
+        raise NotImplementedError
+
+    @contextmanager
+    def element(self, tag, attrib):
+        self.start(tag, attrib)
+        yield self
+        self.end()
+
+    def chunk(self, chunk_type: str):
+        """context manager writing a chunk with Type=chunk_type, same as write_chunk"""
+        return self.element('Chunk', {'Type': chunk_type})
+
+    def value(self, name):
+        """context manager writing a value with Name=name, for values containing Items"""
+        return self.element('Value', {'Name': name})
+
+    def val(self, name, value=None):
+        """same as write_val"""
+        if value is None:
+            self.start('Value', {'Name': name})
+        else:
+            self.start('Value', {'Name': name, 'Value': str(value)})
+        self.end()
+
+    def xyz(self, name, x, y, z, element='Value'):
+        """same as write_xyz. SWAPS Y AND Z"""
+        if name:
+            self.start(element, {'Name': name, 'X': str(x), 'Y': str(z), 'Z': str(y)})
+        else:
+            self.start(element, {'X': str(x), 'Y': str(z), 'Z': str(y)})
+        self.end()
+
+    def mat_xyz(self, name, x=0, y=0, z=0):
+        """same as write_mat_xyz. SWAPS Y AND Z"""
+        self.start('Value', {'Name': name, **mat_xyz_attrib(x, y, z)})
+        self.end()
+
+
+class P3DXMLWriter(P3DWriter):
+    """Writes p3dxml elements straight into a file as they come, in the same format as write_ET"""
+
+    def __init__(self, f):
+        self.f = f
+        self.tags = []
+        self.start_open = False  # start tag of the innermost element isn't closed with '>' yet
+
+    def close_start(self):
+        if self.start_open:
+            self.f.write('>')
+            self.start_open = False
+
+    def start(self, tag, attrib):
+        self.close_start()
+        indent = '\t' * len(self.tags)
+        self.f.write(f"\n{indent}<{tag}")
+        for name, value in attrib.items():
+            self.f.write(f' {name}="{escape_xml(value)}"')
+        self.tags.append(tag)
+        self.start_open = True
+
+    def end(self):
+        tag = self.tags.pop()
+        if self.start_open:
+            self.f.write('/>')
+            self.start_open = False
+        else:
+            indent = '\t' * len(self.tags)
+            self.f.write(f"\n{indent}</{tag}>")
+
+    def write(self, elem):
+        self.close_start()
+        write_element(self.f, elem, len(self.tags))
+
+    def write_raw(self, text):
+        """writes already encoded p3dxml text, it has to be indented for the current depth"""
+        self.close_start()
+        self.f.write(text)
+
+
+@contextmanager
+def p3d_writer(filepath, ver=4.4):
+    """opens filepath for writing and yields P3DXMLWriter inside the Pure3DFile root.
+    .p3d filepaths get a binary writer with the same interface"""
+    with phase('write'):
+        if is_p3d(filepath):
+            from .utils_p3d import p3d_binary_writer
+            with p3d_binary_writer(filepath) as writer:
+                yield writer
+            return
+        with open(filepath, "w", buffering=1 << 16) as f:
+            f.write(XML_DECLARATION)
+            writer = P3DXMLWriter(f)
+            with writer.element('Pure3DFile', {'LucasPure3DEditorVersion': str(ver)}):
+                yield writer
 
 
 def find_chunks(loc, chunktype):
     """returns all ET in loc of chunktype"""
-    return loc.findall(f"*[@Type='{chunktype}']")
+    return [chunk for chunk in loc if chunk.get('Type') == chunktype]
+
+
+# {ET: {Name: child ET}}, filled lazily by named_children and dropped together with the ET
+named_children_cache = weakref.WeakKeyDictionary()
+
+
+def named_children(loc):
+    """returns dictionary { Name : first child with that Name } of loc. Built once per loc on first access"""
+    named = named_children_cache.get(loc)
+    if named is None:
+        named = {}
+        for child in loc:
+            name = child.get('Name')
+            if name is not None and name not in named:
+                named[name] = child
+        named_children_cache[loc] = named
+    return named
+
+
+def find_named(loc, valname):
+    """returns child of loc named valname, None if not found"""
+    return named_children(loc).get(valname)
 
 
 def find_val(loc, valname):
     """returns Value named valname in loc"""
-    if 'Value' in loc.find(f"*[@Name='{valname}']").attrib:
-        return loc.find(f"*[@Name='{valname}']").attrib['Value']
+    return named_children(loc)[valname].get('Value')
 
 
 def chunks_to_dict_by_name(chunks):
@@ -95,7 +299,7 @@ def chunks_to_dict_by_name(chunks):
 def find_xyz(loc, valname):
     """returns vector named valname in loc"""
     v = Vector()
-    values = loc.find(f"*[@Name='{valname}']").attrib
+    values = named_children(loc)[valname].attrib
     v.x = float(values['X'])
     v.y = float(values['Z'])
     v.z = float(values['Y'])
@@ -111,9 +315,19 @@ def item_to_vector(item):
     return v
 
 
+# file X, Y, Z columns -> Blender X, Y, Z
+SWAP_YZ = [0, 2, 1]
+
+
+def find_positions(loc, valname='Positions'):
+    """returns (N, 3) float array of all Items of vector list named valname in loc. SWAPS Y and Z"""
+    coords = [item.attrib[k] for item in named_children(loc)[valname] for k in 'XYZ']
+    return np.array(coords, dtype=np.float64).reshape(-1, 3)[:, SWAP_YZ]
+
+
 def find_HalfExtent_scale(loc):
     scale = Vector()
-    values = loc.find("*[@Name='HalfExtents']").attrib
+    values = named_children(loc)['HalfExtents'].attrib
     scale.x = float(values['X'])
     scale.y = float(values['Z'])
     scale.z = float(values['Y'])
@@ -140,7 +354,7 @@ def write_locrot_to_mat(loc, obj, name="Matrix"):
 def find_xyz_from_mat(loc, mat_name):
     """returns xyz from matrix named mat_name in loc"""
     a = Vector()
-    values = loc.find(f"*[@Name='{mat_name}']").attrib
+    values = named_children(loc)[mat_name].attrib
     a.x = float(values['M41'])
     a.y = float(values['M43'])
     a.z = float(values['M42'])
@@ -153,7 +367,7 @@ def find_xyz_from_transform_mat(loc):
 
 def find_euler_from_mat(loc, mat_name):
     rot_mat = Matrix()
-    values = loc.find(f"*[@Name='{mat_name}']").attrib
+    values = named_children(loc)[mat_name].attrib
     for i in range(3):
         for j in range(3):
             rot_mat[i][j] = float(values[f'M{i+1}{j+1}'])
@@ -162,12 +376,172 @@ def find_euler_from_mat(loc, mat_name):
     return q.to_euler()
 
 
+# Junk left in string values by the p3d -> p3dxml conversion. Never spans multiple lines
+NUL_JUNK = re.compile(b'&#x0;.+?"')
+
+
+def sanitised_lines(f):
+    """yields lines of binary file f with &#x0; junk stripped"""
+    for line in f:
+        yield NUL_JUNK.sub(b'"', line)
+
+
 def terra_read(fp):
     """reads ENTIRE TERRA, returns ET"""
-    with open(fp, 'r') as (f):
-        Text = f.read()
-        Text = re.sub('&#x0;.+?"', '"', Text)
-        return ET.fromstring(Text)
+    with phase('parse'):
+        if is_p3d(fp):
+            from .utils_p3d import p3d_read
+            return p3d_read(fp)
+        # whole buffer at once, sanitising line by line is only worth it when streaming
+        with open(fp, 'rb') as f:
+            return ET.fromstring(NUL_JUNK.sub(b'"', f.read()))
+
+
+def terra_iter(fp, types=None, use_index=True):
+    """reads TERRA one top level chunk at a time, yields Chunk ETs (only of given types if set).
+    Each chunk is cleared once the next one is requested, so keep whatever you need from it.
+    If types are set and the file's chunk index is cached (see terra_iter_stream), only their byte ranges are read"""
+    return phase_iter('parse', iter_terra_chunks(fp, types, use_index))
+
+
+def iter_terra_chunks(fp, types, use_index):
+    """terra_iter without timing"""
+    if is_p3d(fp):
+        from .utils_p3d import p3d_iter
+        for chunk in p3d_iter(fp, types):
+            yield chunk
+            chunk.clear()
+        return
+    index = cached_chunk_index(fp) if use_index else None
+    if index is not None and types is not None and indexed_share(index, types) <= INDEX_MAX_SHARE:
+        yield from terra_iter_indexed(fp, types, index)
+        return
+    # streaming parse records the index on the way, so the next typed read can use it
+    yield from terra_iter_stream(fp, types, use_index and index is None)
+
+
+def terra_iter_stream(fp, types, record):
+    """same as terra_iter, streaming the whole file. If record is set, byte ranges of top level chunks
+    are cached as chunk index of fp once the file has been read to its end"""
+    parser = ET.XMLPullParser(('start', 'end'))
+    root = None
+    depth = 0
+    key = index_key(fp) if record else None
+    chunks = {}
+    head = b''
+    # chunk ranges are whole lines: from the end of the line where the previous top level element ended
+    # to the end of the line where the chunk ends. boundary is (line number, raw offset) of the last such line end
+    boundary = (-1, 0)
+    raw_pos = 0
+    with open(fp, 'rb') as f:
+        for line_number, raw_line in enumerate(f):
+            if line_number == 0:
+                declaration = XML_DECLARATION_RE.match(raw_line)
+                head = declaration.group(0) if declaration else b''
+            raw_pos += len(raw_line)
+            parser.feed(NUL_JUNK.sub(b'"', raw_line))
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        boundary = (line_number, raw_pos)
+                    elif depth == 1 and line_number == boundary[0]:
+                        # starts on the same line the previous one ended, can't be split at line ends
+                        record = False
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 1 or root.tag == 'Chunk':
+                    continue
+                if record:
+                    chunks.setdefault(elem.get('Type'), []).append([boundary[1], raw_pos])
+                    boundary = (line_number, raw_pos)
+                if types is None or elem.get('Type') in types:
+                    yield elem
+                elem.clear()
+                del root[:]
+        parser.close()
+    # file is a single chunk without Pure3DFile root
+    if root is not None and root.tag == 'Chunk':
+        if types is None or root.get('Type') in types:
+            yield root
+    elif record and root is not None:
+        save_chunk_index(fp, {'version': INDEX_VERSION, 'head': head.decode('latin-1'), 'chunks': chunks, **key})
+
+
+XML_DECLARATION_RE = re.compile(rb'(\xef\xbb\xbf)?\s*<\?xml[^>]*\?>')
+
+# Chunk index: {"version", "path", "mtime", "size", "head", "chunks": {Type: [[start, end], ...]}},
+# recorded by terra_iter_stream and cached in INDEX_DIR (never next to the map file, which may be read-only)
+INDEX_DIR = os.path.join(tempfile.gettempdir(), 'wmde_chunk_index')
+INDEX_EXT = '.wmdeidx'
+INDEX_VERSION = 2
+# ranged reads only pay off if requested chunks are at most this share of the file, otherwise it's streamed
+INDEX_MAX_SHARE = 0.5
+chunk_indices = {}
+
+
+def index_path(fp):
+    """returns path of the cached chunk index of absolute TERRA path fp in INDEX_DIR"""
+    return os.path.join(INDEX_DIR, hashlib.sha1(fp.encode('utf-8', 'surrogateescape')).hexdigest() + INDEX_EXT)
+
+
+def index_key(fp):
+    """returns what a chunk index of fp is valid for: its absolute path, mtime and size"""
+    fp = os.path.abspath(fp)
+    stat = os.stat(fp)
+    return {'path': fp, 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def cached_chunk_index(fp):
+    """returns chunk index of TERRA kept in memory or INDEX_DIR, None if there's no valid one"""
+    key = index_key(fp)
+
+    def valid(index):
+        return index and index.get('version') == INDEX_VERSION and all(index.get(k) == v for k, v in key.items())
+
+    index = chunk_indices.get(key['path'])
+    if valid(index):
+        return index
+    try:
+        with open(index_path(key['path']), 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not valid(index):
+        return None
+    chunk_indices[key['path']] = index
+    return index
+
+
+def save_chunk_index(fp, index):
+    """keeps chunk index of fp in memory and caches it in INDEX_DIR. Failing to cache it isn't an error"""
+    chunk_indices[index['path']] = index
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(index_path(index['path']), 'w') as f:
+            json.dump(index, f)
+    except OSError:
+        print(f"Could not cache chunk index of {fp}")
+
+
+def indexed_share(index, types):
+    """returns share of the file taken by chunks of types according to index"""
+    size = sum(end - start for chunk_type in set(types) for start, end in index['chunks'].get(chunk_type, []))
+    return size / max(index['size'], 1)
+
+
+def terra_iter_indexed(fp, types, index):
+    """same as terra_iter, but only reads byte ranges of chunks of given types using chunk index of fp"""
+    head = index['head'].encode('latin-1')
+    ranges = sorted(r for chunk_type in set(types) for r in index['chunks'].get(chunk_type, []))
+    with open(fp, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            data = f.read(end - start).splitlines(True)
+            for chunk in ET.fromstringlist([head, b'<Pure3DFile>', *sanitised_lines(data), b'</Pure3DFile>']):
+                yield chunk
+                chunk.clear()
 
 
 def split_terra(input_file, already_split=False):
@@ -234,7 +608,7 @@ def find_locrot_LOM(loc):
     if not find_chunks(loc, LOM):
         return
     lm = find_chunks(loc, LOM)[0]
-    lm = lm.find("*[@Name='Matrix']").attrib
+    lm = named_children(lm)['Matrix'].attrib
     tran_mat = Matrix()
     for i in range(4):
         for j in range(4):
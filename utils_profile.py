@@ -0,0 +1,227 @@
+"""Operator profiling and tracing.
+Profiling: wall time, datablock count changes and phase breakdown of the last operator runs.
+Operators get it via @profiled on execute, code inside marks its phases with `with phase('parse'):` or `@phase('build')`.
+Phases are exclusive: time spent in a nested phase isn't counted in the outer one.
+Shown in the WMDE Performance panel (see PerformanceClasses).
+Tracing: while on, every phase and every @traced function call is recorded as a span, see save_trace"""
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+from collections import deque
+from time import perf_counter, strftime, time
+
+PHASES = ['parse', 'lookup', 'build', 'new', 'link', 'write']
+DATABLOCKS = ['objects', 'meshes', 'curves', 'collections']
+
+runs = deque(maxlen=10)
+active = None
+
+tracing = False
+# (name, category, start, end, thread id) of finished spans and start times of open ones
+trace_events = []
+trace_stack = []
+trace_origin = 0.0
+
+
+class Run:
+    """one profiled operator run"""
+    __slots__ = ('operator', 'label', 'started', 'seconds', 'result', 'datablocks', 'phases', 'profile', 'stack')
+
+    def __init__(self, operator, label):
+        self.operator = operator
+        self.label = label
+        self.started = time()
+        self.seconds = 0.0
+        self.result = ''
+        self.datablocks = {}
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.profile = ''
+        # [[phase name, time it was (re)entered], ...]
+        self.stack = []
+
+    def other(self):
+        """returns seconds not spent in any phase"""
+        return max(0.0, self.seconds - sum(self.phases.values()))
+
+
+class Span:
+    """context manager (or function decorator) recording a trace span while tracing is on.
+    Phase spans also time a phase of the active run. Does nothing if neither is on"""
+    __slots__ = ('name', 'category', 'is_phase')
+
+    def __init__(self, name, category, is_phase):
+        self.name = name
+        self.category = category
+        self.is_phase = is_phase
+
+    def __enter__(self):
+        if tracing:
+            trace_stack.append(perf_counter())
+        run = active
+        if run is None or not self.is_phase:
+            return
+        now = perf_counter()
+        if run.stack:
+            outer = run.stack[-1]
+            run.phases[outer[0]] = run.phases.get(outer[0], 0.0) + now - outer[1]
+        run.stack.append([self.name, now])
+
+    def __exit__(self, *exc):
+        if not tracing and active is None:
+            return
+        now = perf_counter()
+        if tracing and trace_stack:
+            trace_events.append((self.name, self.category, trace_stack.pop(), now, threading.get_ident()))
+        run = active
+        if run is None or not self.is_phase or not run.stack:
+            return
+        name, start = run.stack.pop()
+        run.phases[name] = run.phases.get(name, 0.0) + now - start
+        if run.stack:
+            run.stack[-1][1] = now
+
+    def __call__(self, func):
+        """records every call of func as this span"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+phases = {}
+spans = {}
+
+
+def phase(name):
+    """returns context manager (or function decorator) timing name phase of the running operator"""
+    try:
+        return phases[name]
+    except KeyError:
+        phases[name] = Span(name, 'phase', True)
+        return phases[name]
+
+
+def span(name, category='function'):
+    """returns context manager (or function decorator) recording name span while tracing"""
+    key = (name, category)
+    if key not in spans:
+        spans[key] = Span(name, category, False)
+    return spans[key]
+
+
+def traced(func):
+    """records every call of func as a span named after it while tracing, costs a single check otherwise"""
+    timer = span(func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not tracing:
+            return func(*args, **kwargs)
+        with timer:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def start_tracing():
+    """forgets recorded spans and starts recording"""
+    global tracing, trace_origin
+    trace_events.clear()
+    trace_stack.clear()
+    trace_origin = perf_counter()
+    tracing = True
+
+
+def stop_tracing():
+    global tracing
+    tracing = False
+    trace_stack.clear()
+
+
+def save_trace(filepath):
+    """writes recorded spans into filepath as Chrome trace event JSON (chrome://tracing, Perfetto, speedscope)"""
+    pid = os.getpid()
+    events = [{'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+               'ts': round((start - trace_origin) * 1e6, 3), 'dur': round((end - start) * 1e6, 3)}
+              for name, category, start, end, tid in trace_events]
+    with open(filepath, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
+
+
+def phase_iter(name, iterable):
+    """yields from iterable, timing every step of it as name phase"""
+    if active is None and not tracing:
+        yield from iterable
+        return
+    timer = phase(name)
+    iterator = iter(iterable)
+    while True:
+        with timer:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def datablock_counts():
+    import bpy
+    return {x: len(getattr(bpy.data, x)) for x in DATABLOCKS}
+
+
+def set_max_runs(count):
+    global runs
+    runs = deque(runs, maxlen=max(1, count))
+
+
+def profile_path(directory, operator):
+    """returns .prof filepath for operator run in directory (temp directory if empty)"""
+    if not directory:
+        import bpy
+        directory = bpy.app.tempdir or os.getcwd()
+    directory = os.path.abspath(os.path.expanduser(directory))
+    os.makedirs(directory, exist_ok=True)
+    name = re.sub(r'\W+', '_', operator)
+    return os.path.join(directory, f"{name}_{strftime('%Y%m%d_%H%M%S')}.prof")
+
+
+def profiled(execute):
+    """records runs of operator's execute into runs. Nested operator runs are part of the outer one.
+    If window manager's wmde_profile.capture is on, the run is also profiled with cProfile into a .prof file"""
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        global active
+        if active is not None:
+            return execute(self, context)
+        settings = getattr(context.window_manager, 'wmde_profile', None)
+        run = Run(self.bl_idname, self.bl_label)
+        profiler = cProfile.Profile() if settings and settings.capture else None
+        before = datablock_counts()
+        active = run
+        start = perf_counter()
+        try:
+            with span(run.operator, 'operator'):
+                if profiler:
+                    result = profiler.runcall(execute, self, context)
+                else:
+                    result = execute(self, context)
+            run.result = ', '.join(sorted(result))
+            return result
+        except Exception:
+            run.result = 'ERROR'
+            raise
+        finally:
+            run.seconds = perf_counter() - start
+            active = None
+            run.stack.clear()
+            after = datablock_counts()
+            run.datablocks = {x: after[x] - before[x] for x in DATABLOCKS if after[x] != before[x]}
+            if profiler:
+                run.profile = profile_path(settings.directory, run.operator)
+                profiler.dump_stats(run.profile)
+            runs.append(run)
+    return wrapper
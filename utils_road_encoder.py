@@ -0,0 +1,120 @@
+"""Encodes road network p3dxml chunks from plain data (see RoadManager.snapshot_roads).
+Only needs the bpy-free core, so worker processes can import it without Blender (see encode_roads_parallel).
+Output is the same P3DXMLWriter writes at the top level of Pure3DFile, write_intersections and write_road
+write the same chunks through any P3DWriter (used for binary .p3d)"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .utils_p3dxml import RDS, INS, ROA, RSG, escape_xml
+
+
+def val(name, value, indent='\t\t'):
+    return f'\n{indent}<Value Name="{escape_xml(name)}" Value="{escape_xml(str(value))}"/>'
+
+
+def xyz(name, x, y, z, indent='\t\t'):
+    """SWAPS Y AND Z"""
+    return f'\n{indent}<Value Name="{escape_xml(name)}" X="{x}" Y="{z}" Z="{y}"/>'
+
+
+def mat_xyz(name, x=0.0, y=0.0, z=0.0, indent='\t\t'):
+    """same as utils_p3dxml.mat_xyz_attrib, values have to be float32 already. SWAPS Y AND Z"""
+    if x == y == z == 0:
+        # mat_xyz_attrib leaves identity matrix as is, so -0.0 is written as 0.0
+        x = y = z = 0.0
+    cells = (1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, float(x), float(z), float(y), 1.0)
+    attrib = ' '.join(f'M{i // 4 + 1}{i % 4 + 1}="{cell}"' for i, cell in enumerate(cells))
+    return f'\n{indent}<Value Name="{escape_xml(name)}" {attrib}/>'
+
+
+def chunk(chunk_type, body, indent='\t'):
+    return f'\n{indent}<Chunk Type="{chunk_type}">{body}\n{indent}</Chunk>'
+
+
+def encode_intersections(inters):
+    """returns INS chunks of [(name, (x, y, z), radius, behaviour), ...]"""
+    return ''.join(chunk(INS, val('Name', name) + xyz('Position', *position) + val('Radius', radius) + val('TrafficBehaviour', behaviour))
+                   for name, position, radius, behaviour in inters)
+
+
+def encode_road(road):
+    """returns RDS chunks of every road shape followed by ROA chunk of road dictionary"""
+    parts = []
+    for name, origin, p1, p2, p3 in road['shapes']:
+        parts.append(chunk(RDS, val('Name', name) + val('Lanes', road['lanes']) + xyz('Position', *p1) + xyz('Position2', *p2) + xyz('Position3', *p3)))
+    body = [
+        val('Name', road['name']),
+        val('StartIntersectionLocatorNode', road['start_inter']),
+        val('EndIntersectionLocatorNode', road['end_inter']),
+        val('MaximumCars', road['max_cars']),
+        val('NoReset', road['noreset']),
+        val('Unknown2', road['speed']),
+        val('Unknown3', road['intel']),
+        val('Unknown4', road['unknown']),
+    ]
+    for name, origin, p1, p2, p3 in road['shapes']:
+        body.append(chunk(RSG, val('Name', name, '\t\t\t') + val('CubeShape', name, '\t\t\t') + mat_xyz('Transform', *origin, indent='\t\t\t') + mat_xyz('Unknown', indent='\t\t\t'), '\t\t'))
+    parts.append(chunk(ROA, ''.join(body)))
+    return ''.join(parts)
+
+
+def encode_roads(roads):
+    """returns chunks of every road in roads, in order"""
+    return ''.join(encode_road(road) for road in roads)
+
+
+def write_intersections(w, inters):
+    """writes chunks encode_intersections returns through P3DWriter w"""
+    for name, position, radius, behaviour in inters:
+        with w.chunk(INS):
+            w.val('Name', name)
+            w.xyz('Position', *position)
+            w.val('Radius', radius)
+            w.val('TrafficBehaviour', behaviour)
+
+
+def write_road(w, road):
+    """writes chunks encode_road returns through P3DWriter w"""
+    for name, origin, p1, p2, p3 in road['shapes']:
+        with w.chunk(RDS):
+            w.val('Name', name)
+            w.val('Lanes', road['lanes'])
+            w.xyz('Position', *p1)
+            w.xyz('Position2', *p2)
+            w.xyz('Position3', *p3)
+    with w.chunk(ROA):
+        w.val('Name', road['name'])
+        w.val('StartIntersectionLocatorNode', road['start_inter'])
+        w.val('EndIntersectionLocatorNode', road['end_inter'])
+        w.val('MaximumCars', road['max_cars'])
+        w.val('NoReset', road['noreset'])
+        w.val('Unknown2', road['speed'])
+        w.val('Unknown3', road['intel'])
+        w.val('Unknown4', road['unknown'])
+        for name, origin, p1, p2, p3 in road['shapes']:
+            with w.chunk(RSG):
+                w.val('Name', name)
+                w.val('CubeShape', name)
+                w.mat_xyz('Transform', *origin)
+                w.mat_xyz('Unknown')
+
+
+# run by every worker process before anything is unpickled: registers the add-on directory as its package
+# without running its __init__ (which needs bpy), so this module is imported by its package qualified name
+WORKER_BOOTSTRAP = """
+import importlib.machinery, importlib.util, sys
+if {name!r} not in sys.modules:
+    package = importlib.util.module_from_spec(importlib.machinery.ModuleSpec({name!r}, None, is_package=True))
+    package.__path__ = [{path!r}]
+    sys.modules[{name!r}] = package
+"""
+
+
+def encode_roads_parallel(roads, workers):
+    """yields (number of roads, p3dxml fragment of them) of roads in order, encoded in batches by workers spawned processes.
+    Each batch is yielded as soon as it and the ones before it are done"""
+    size = len(roads) // (workers * 4) + 1
+    batches = [roads[i:i + size] for i in range(0, len(roads), size)]
+    bootstrap = WORKER_BOOTSTRAP.format(name=__package__, path=os.path.dirname(os.path.abspath(__file__)))
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=exec, initargs=(bootstrap, {})) as pool:
+        yield from zip(map(len, batches), pool.map(encode_roads, batches))
@@ -0,0 +1,157 @@
+"""Synthetic map data for benchmarking importers and exporters (see cli.py --bench)"""
+import base64
+import math
+import struct
+from .utils_p3dxml import *
+
+# Rail Cam 'Data' with default camera settings, see B64ToRailCam
+RAIL_CAM_DATA = base64.standard_b64encode(struct.pack("<iffififffffffff", 0, 1, 5, 0, 0, 0, 60, 0, 0, 0, 0.04, 1, 0, 0.1, 0.1)).decode('ascii')
+# every locator type supported by LocatorManager.locator_import
+LOCATOR_TYPES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 12, 13, 14]
+# locator types that get a trigger volume
+TRIGGERED_TYPES = [0, 5, 6, 9, 12, 13]
+SPACING = 200
+
+
+def grid_position(i, count):
+    """returns (x, y) of i'th cell of a square grid big enough for count cells"""
+    side = max(1, math.ceil(math.sqrt(count)))
+    return (i % side) * SPACING, (i // side) * SPACING
+
+
+def write_items(w, name, points):
+    with w.value(name):
+        for x, y, z in points:
+            w.xyz(None, x, y, z, element='Item')
+
+
+def write_synthetic_locator(w, name, loctype, x, y):
+    with w.chunk(LOC):
+        w.val('Name', name)
+        w.val('LocatorType', loctype)
+        w.xyz('Position', x, y, 0)
+        if loctype in [0, 9]:
+            with w.chunk(LOM):
+                w.mat_xyz('Matrix', x, y, 0)
+        with w.value('Data'):
+            if loctype == 0:
+                w.val('Unknown', 2)
+                w.val('Unknown2')
+            elif loctype == 1:
+                w.val('Unknown', 'synthetic_script')
+            elif loctype == 3:
+                w.val('Rotation', 90.0)
+                w.val('ParkedCar', 1)
+                w.val('FreeCar', 'synthetic_car')
+            elif loctype == 5:
+                w.val('DynaLoadData', 'l1z1.p3d;')
+            elif loctype == 6:
+                w.val('Occlusions', 1)
+            elif loctype in [7, 8]:
+                if loctype == 7:
+                    w.val('InteriorName', 'synthetic_interior')
+                write_items(w, 'Matrix', [(1, 0, 0), (0, 0, 1), (0, 1, 0)])
+            elif loctype == 9:
+                with w.value('Unknown'):
+                    for value in ['synthetic_object', 'synthetic_joint', 'Wrench']:
+                        w.start('Item', {'Value': value})
+                        w.end()
+                w.val('Unknown2', 3)
+                w.val('Unknown3', 1)
+            elif loctype == 12:
+                w.xyz('TargetPosition', x + 10, y, 0)
+                w.val('FOV', 60.0)
+                w.val('Unknown', 0.04)
+                w.val('FollowPlayer', 0)
+                w.val('Unknown2', 0.0)
+                w.val('Unknown3', 0)
+                w.val('Unknown4', 0)
+                w.val('Unknown5', 0)
+            elif loctype == 13:
+                w.val('Unknown', 1)
+        if loctype == 4:
+            with w.chunk('0x3000007'):
+                w.val('Name', f"{name}Spline")
+                write_items(w, 'Positions', [(x + i * 5, y, 5) for i in range(6)])
+                with w.chunk('0x300000A'):
+                    w.val('Name', f"{name}Cam")
+                    w.val('Data', RAIL_CAM_DATA)
+        w.val('NumTriggers', int(loctype in TRIGGERED_TYPES))
+        if loctype in TRIGGERED_TYPES:
+            with w.chunk(VOL):
+                w.val('Name', f"{name}Trigger")
+                w.val('IsRect', 1)
+                w.xyz('HalfExtents', 5, 5, 5)
+                w.mat_xyz('Matrix', x, y, 0)
+
+
+def write_synthetic_map(filepath, intersections=100, roads=100, segments=10, locators=10, paths=100, fences=100):
+    """writes a synthetic map into filepath (.p3dxml or .p3d) with:
+    intersections on a grid, roads between neighbouring intersections with segments road shapes each,
+    locators of every type, paths of 8 points and single segment fences.
+    returns {chunk kind: count}"""
+    if intersections < 2:
+        roads = 0
+    counts = {'intersections': intersections, 'roads': roads, 'road_shapes': roads * segments,
+              'locators': locators * len(LOCATOR_TYPES), 'paths': paths, 'fences': fences}
+    with p3d_writer(filepath) as w:
+        for i in range(intersections):
+            with w.chunk(INS):
+                w.val('Name', f"SynInter{i}")
+                w.xyz('Position', *grid_position(i, intersections), 0)
+                w.val('Radius', 10.0)
+                w.val('TrafficBehaviour', 1)
+
+        for r in range(roads):
+            start, end = r % intersections, (r + 1) % intersections
+            (x0, y0), (x1, y1) = grid_position(start, intersections), grid_position(end, intersections)
+            length = math.hypot(x1 - x0, y1 - y0) or 1
+            # unit direction and left side normal of the road, 5 units half width
+            dx, dy = (x1 - x0) / length, (y1 - y0) / length
+            nx, ny = -dy * 5, dx * 5
+            origins = []
+            for k in range(segments):
+                t0, t1 = k / segments, (k + 1) / segments
+                ax, ay = x0 + (x1 - x0) * t0 + nx, y0 + (y1 - y0) * t0 + ny
+                bx, by = x0 + (x1 - x0) * t1 + nx, y0 + (y1 - y0) * t1 + ny
+                # a -> b along the left side, c -> d back along the right side
+                with w.chunk(RDS):
+                    w.val('Name', f"SynRoad{r}Shape{k}")
+                    w.val('Lanes', 1)
+                    w.xyz('Position', bx - ax, by - ay, 0)
+                    w.xyz('Position2', bx - ax - 2 * nx, by - ay - 2 * ny, 0)
+                    w.xyz('Position3', -2 * nx, -2 * ny, 0)
+                origins.append((ax, ay, 0))
+            with w.chunk(ROA):
+                w.val('Name', f"SynRoad{r}")
+                w.val('StartIntersectionLocatorNode', f"SynInter{start}")
+                w.val('EndIntersectionLocatorNode', f"SynInter{end}")
+                w.val('MaximumCars', 3)
+                w.val('NoReset', 0)
+                w.val('Unknown2', 50)
+                w.val('Unknown3', 2)
+                w.val('Unknown4', 0)
+                for k, origin in enumerate(origins):
+                    with w.chunk(RSG):
+                        w.val('Name', f"SynRoad{r}Shape{k}")
+                        w.val('CubeShape', f"SynRoad{r}Shape{k}")
+                        w.mat_xyz('Transform', *origin)
+                        w.mat_xyz('Unknown')
+
+        for i in range(locators):
+            for loctype in LOCATOR_TYPES:
+                x, y = grid_position(i, locators)
+                write_synthetic_locator(w, f"SynLoc{loctype}_{i}", loctype, x + loctype * 10, y + 20)
+
+        for i in range(paths):
+            x, y = grid_position(i, paths)
+            with w.chunk(PAT):
+                write_items(w, 'Positions', [(x + 30 + math.cos(j * math.pi / 4) * 10, y + 30 + math.sin(j * math.pi / 4) * 10, 0) for j in range(8)])
+
+        for i in range(fences):
+            x, y = grid_position(i, fences)
+            with w.chunk(FEN), w.chunk(FEN2):
+                w.xyz('Start', x - 50, y - 50, 0)
+                w.xyz('End', x - 50, y + 50, 0)
+                w.xyz('Normal', 1, 0, 0)
+    return counts